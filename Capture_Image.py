@@ -2,6 +2,9 @@ import csv
 import re
 import cv2
 import os
+from face_detector import get_detector
+from face_dedup import FaceDeduplicator
+from image_sink import AsyncImageWriter
 #from main_gui import tkEmail, tkID, tkName
 
 
@@ -39,21 +42,26 @@ def takeImages(Id,name,email):
     regex = '^[a-z0-9]+[\._]?[a-z0-9]+[@]\w+[.]\w{2,3}$'
     if(is_number(Id) and re.search(regex,email)):
         cam = cv2.VideoCapture(0)
-        harcascadePath = "haarcascade_frontalface_default.xml"
-        detector = cv2.CascadeClassifier(harcascadePath)
+        detector = get_detector()
+        deduplicator = FaceDeduplicator()
+        writer = AsyncImageWriter()
         sampleNum = 0
 
         while(True):
             ret, img = cam.read()
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = detector.detectMultiScale(gray, 1.3, 5, minSize=(30,30),flags = cv2.CASCADE_SCALE_IMAGE)
+            faces = detector.detect(gray, min_size=(30,30))
             for(x,y,w,h) in faces:
                 cv2.rectangle(img, (x, y), (x+w, y+h), (10, 159, 255), 2)
-                #incrementing sample number
-                sampleNum = sampleNum+1
-                #saving the captured face in the dataset folder TrainingImage
-                cv2.imwrite("TrainingImage" + os.sep +name + "."+Id + '.' +
-                            str(sampleNum) + ".jpg", gray[y:y+h, x:x+w])
+                # skip near-duplicates of faces already saved
+                if not deduplicator.add(gray[y:y+h, x:x+w]):
+                    cv2.imshow('frame', img)
+                    continue
+                #saving the captured face in the dataset folder TrainingImage,
+                #counting it only if the writer accepted it (a full queue drops it)
+                if writer.write("TrainingImage" + os.sep +name + "."+Id + '.' +
+                                str(sampleNum + 1) + ".jpg", gray[y:y+h, x:x+w].copy()):
+                    sampleNum = sampleNum+1
                 #display the frame
                 cv2.imshow('frame', img)
             #wait for 100 miliseconds
@@ -64,6 +72,7 @@ def takeImages(Id,name,email):
                 break
         cam.release()
         cv2.destroyAllWindows()
+        writer.close()
         temp=''.join(list(i for i in name.split()))
         res = "Images Saved for ID : " + Id + " Name : " + temp + "Email :" + email 
         row = [Id, name,email]
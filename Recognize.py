@@ -5,13 +5,17 @@ import time
 import cv2
 import pandas as pd
 from csv import writer 
+from face_detector import get_detector
+from face_recognition_engine import recognize_faces_batch
+from face_preprocess import load_settings, preparer_for
 
 #-------------------------
 def recognize_attendence():
     recognizer = cv2.face.LBPHFaceRecognizer_create()  # cv2.createLBPHFaceRecognizer()
     recognizer.read("TrainingImageLabel"+os.sep+"Trainner.yml")
-    harcascadePath = "haarcascade_frontalface_default.xml"
-    faceCascade = cv2.CascadeClassifier(harcascadePath)
+    # The GUI trainer saves this file from preprocessed faces; prepare crops the same way
+    prepare = preparer_for(load_settings("TrainingImageLabel"+os.sep+"Trainner.yml"))
+    detector = get_detector()
     df = pd.read_csv("EmployeeDetails"+os.sep+"EmployeeDetails.csv")
     font = cv2.FONT_HERSHEY_SIMPLEX
     col_names = ['Id', 'Name', 'Time']
@@ -30,12 +34,13 @@ def recognize_attendence():
 
         ret, im = cam.read()
         gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-        faces = faceCascade.detectMultiScale(gray, 1.2, 5,minSize = (int(minW), int(minH)),flags = cv2.CASCADE_SCALE_IMAGE)
-        for(x, y, w, h) in faces:
+        faces = detector.detect(gray, min_size=(int(minW), int(minH)))
+        # Labels of this model are the employee Ids themselves
+        results = recognize_faces_batch(recognizer, gray, faces, threshold=100, prepare=prepare)
+        for (x, y, w, h), (Id, conf, known) in zip(faces, results.tolist()):
             cv2.rectangle(im, (x, y), (x+w, y+h), (10, 159, 255), 2)
-            Id, conf = recognizer.predict(gray[y:y+h, x:x+w])
 
-            if conf < 100:
+            if known:
 
                 aa = df.loc[df['Id'] == Id]['Name'].values
                 confstr = "  {0}%".format(round(100 - conf))
@@ -1,9 +1,9 @@
 import os
-import time
 import cv2
 import numpy as np
 from PIL import Image
-from threading import Thread
+from training_jobs import training_lock
+from face_preprocess import save_settings
 
 
 
@@ -35,21 +35,18 @@ def getImagesAndLabels(path):
 # ----------- train images function ---------------
 def TrainImages():
     recognizer = cv2.face_LBPHFaceRecognizer.create()
-    harcascadePath = "haarcascade_frontalface_default.xml"
-    detector = cv2.CascadeClassifier(harcascadePath)
     faces, Id = getImagesAndLabels("TrainingImage")
-    Thread(target = recognizer.train(faces, np.array(Id))).start()
-    # Below line is optional for a visual counter effect
-    Thread(target = counter_img("TrainingImage")).start()
-    recognizer.save("TrainingImageLabel"+os.sep+"Trainner.yml")
+    # Same lock as the GUI trainer, so two trainings never write the model at once
+    with training_lock(on_wait=lambda: print("Waiting for another training run...", end="\r")):
+        recognizer.train(faces, np.array(Id))
+        # Save under a temporary name and rename, so an interrupted save keeps the old model
+        recognizer.save("TrainingImageLabel"+os.sep+"Trainner.tmp.yml")
+        os.replace("TrainingImageLabel"+os.sep+"Trainner.tmp.yml", "TrainingImageLabel"+os.sep+"Trainner.yml")
+        # Raw crops: tell Recognize.py and the engine not to preprocess queries for this model
+        save_settings("TrainingImageLabel"+os.sep+"Trainner.yml", preprocessed=False)
+    counter_img(len(faces))
     print("All Images")
 
-# Optional, adds a counter for images trained (You can remove it)
-def counter_img(path):
-    imgcounter = 1
-    imagePaths = [os.path.join(path, f) for f in os.listdir(path)]
-    for imagePath in imagePaths:
-        print(str(imgcounter) + " Images Trained", end="\r")
-        time.sleep(0.008)
-        imgcounter += 1
-
+# Prints the number of images loaded for training
+def counter_img(count):
+    print(str(count) + " Images Trained")
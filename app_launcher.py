@@ -26,7 +26,7 @@ class AppLauncher:
         """Initialize the database if it doesn't exist"""
         try:
             db = Database()
-            messagebox.showinfo("Success", "Database initialized successfully!")
+            print("[v0] Database initialized successfully")
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to initialize database: {str(e)}")
             sys.exit(1)
@@ -180,6 +180,10 @@ class AppLauncher:
         """Launch faculty login interface"""
         try:
             from faculty_login import FacultyLoginWindow
+            from model_warmup import model_warmup
+            
+            # Load the recognition model while the faculty logs in
+            model_warmup.start()
             
             # Create new window
             login_root = tk.Toplevel(self.root)
@@ -1,4 +1,5 @@
 from database import Database
+from service_registry import register_service
 from datetime import datetime
 
 class AttendanceMarker:
@@ -95,5 +96,5 @@ class AttendanceMarker:
         except Exception as e:
             return None, f"Error generating report: {str(e)}"
 
-# Initialize attendance marker
-attendance_marker = AttendanceMarker()
+# Attendance marker, created on first use
+attendance_marker = register_service('attendance_marker', AttendanceMarker)
@@ -1,4 +1,6 @@
 from database import Database
+from service_registry import register_service
+from schedule_index import schedule_index
 from datetime import datetime, timedelta
 import secrets
 
@@ -57,27 +59,14 @@ class AuthManager:
     
     def get_active_class(self, faculty_id):
         """Get the active class for a faculty based on current time"""
-        from datetime import datetime
-        
-        faculty_timetables = self.db.get_faculty_timetables(faculty_id)
-        
-        if not faculty_timetables:
+        if not schedule_index.get_faculty_schedule(faculty_id):
             return None, "No timetables found for this faculty"
         
-        current_time = datetime.now()
-        current_day = current_time.strftime("%A")  # e.g., "Monday"
-        current_time_str = current_time.strftime("%H:%M")
-        
-        for timetable in faculty_timetables:
-            timetable_day = timetable[3]  # day_of_week
-            start_time = timetable[4]
-            end_time = timetable[5]
-            
-            if timetable_day.lower() == current_day.lower():
-                if start_time <= current_time_str <= end_time:
-                    return timetable, "Active class found"
+        timetable = schedule_index.get_active_class(faculty_id)
+        if timetable:
+            return timetable, "Active class found"
         
         return None, "No active class at this time"
 
-# Initialize auth manager
-auth_manager = AuthManager()
+# Auth manager, created on first use
+auth_manager = register_service('auth_manager', AuthManager)
@@ -1,9 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 from email_service import email_service
+from mail_planner import mail_run_planner
 from database import Database
 from datetime import datetime, timedelta
 import threading
+import subprocess
+import sys
+import os
 
 class AutoMailWindow:
     """Auto-mail configuration and sending window"""
@@ -172,81 +176,88 @@ class AutoMailWindow:
         thread = threading.Thread(target=self.perform_send, daemon=True)
         thread.start()
     
+    def start_dispatcher(self):
+        """Start the email dispatcher process that delivers the queued emails"""
+        env = dict(os.environ)
+        env['SENDER_EMAIL'] = email_service.sender_email
+        env['SENDER_PASSWORD'] = email_service.sender_password
+        
+        dispatcher_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_dispatcher.py')
+        subprocess.Popen([sys.executable, dispatcher_script, '--until-empty'], env=env)
+    
     def perform_send(self):
-        """Perform the actual sending"""
+        """Queue attendance summaries in the outbox and start the dispatcher"""
         try:
-            self.log_status("Starting to send attendance summaries...")
+            self.log_status("Queueing attendance summaries...")
             
-            # Get all faculties
-            faculties = self.db.get_all_faculties()
+            # Gather attendance, faculty and student data in one pass
+            plan, message = mail_run_planner.plan()
             
-            if not faculties:
-                self.log_status("No faculties found")
+            if plan is None:
+                self.log_status(f"✗ {message}")
                 return
             
+            if not plan['batches']:
+                self.log_status("No attendance records found")
+            
             total_sent = 0
+            current_faculty_id = None
             
-            for faculty in faculties:
-                faculty_id = faculty[0]
-                faculty_name = faculty[1]
-                faculty_email = faculty[2]
-                
-                self.log_status(f"Processing faculty: {faculty_name}")
+            for batch in plan['batches']:
+                if batch['faculty_id'] != current_faculty_id:
+                    current_faculty_id = batch['faculty_id']
+                    self.log_status(f"Processing faculty: {batch['faculty_name']}")
                 
-                # Get faculty's timetables
-                timetables = self.db.get_faculty_timetables(faculty_id)
-                
-                for timetable in timetables:
-                    timetable_id = timetable[0]
-                    class_name = timetable[2]
-                    
-                    # Get attendance records
-                    attendance_records = self.db.get_attendance_by_session(timetable_id)
+                # Send to faculty
+                if self.send_faculty_var.get():
+                    success, message = email_service.send_attendance_summary_to_faculty(
+                        batch['timetable_id'],
+                        batch['faculty_email'],
+                        batch['faculty_name'],
+                        batch['class_name'],
+                        batch['records'],
+                        queue=True
+                    )
                     
-                    if attendance_records:
-                        # Send to faculty
-                        if self.send_faculty_var.get():
-                            success, message = email_service.send_attendance_summary_to_faculty(
-                                timetable_id,
-                                faculty_email,
-                                faculty_name,
-                                class_name,
-                                attendance_records
-                            )
-                            
-                            if success:
-                                self.log_status(f"✓ Sent summary to faculty: {faculty_name}")
-                                total_sent += 1
-                            else:
-                                self.log_status(f"✗ Failed to send to faculty: {message}")
-                        
-                        # Send to students
-                        if self.send_students_var.get():
-                            email_service.send_attendance_summary_to_students(
-                                timetable_id,
-                                class_name,
-                                attendance_records
-                            )
-                            self.log_status(f"✓ Sent confirmations to {len(attendance_records)} students")
+                    if success and message.startswith("Skipped"):
+                        self.log_status(f"- Faculty summary for {batch['faculty_name']}: {message}")
+                    elif success:
+                        self.log_status(f"✓ Queued summary for faculty: {batch['faculty_name']}")
+                        total_sent += 1
+                    else:
+                        self.log_status(f"✗ Failed to queue faculty summary: {message}")
+                
+                # Send to students
+                if self.send_students_var.get():
+                    success, message = email_service.send_attendance_summary_to_students(
+                        batch['timetable_id'],
+                        batch['class_name'],
+                        batch['records'],
+                        queue=True
+                    )
+                    if success:
+                        self.log_status(f"✓ {message}")
+                    else:
+                        self.log_status(f"✗ Failed to queue student confirmations: {message}")
             
             # Send to admin
             if self.send_admin_var.get():
                 admin_email = self.admin_email_var.get().strip()
                 if admin_email:
-                    report_data = {
-                        'total_sessions': len(faculties),
-                        'total_marked': sum(len(self.db.get_attendance_by_session(t[0])) for f in faculties for t in self.db.get_faculty_timetables(f[0])),
-                        'average_attendance': 85.5
-                    }
-                    
-                    success, message = email_service.send_admin_report(admin_email, report_data)
-                    if success:
-                        self.log_status(f"✓ Sent admin report to: {admin_email}")
+                    success, message = email_service.send_admin_report(admin_email, plan['report_data'], queue=True)
+                    if success and message.startswith("Skipped"):
+                        self.log_status(f"- Admin report for {admin_email}: {message}")
+                    elif success:
+                        self.log_status(f"✓ Queued admin report for: {admin_email}")
                     else:
-                        self.log_status(f"✗ Failed to send admin report: {message}")
+                        self.log_status(f"✗ Failed to queue admin report: {message}")
+            
+            self.start_dispatcher()
             
-            self.log_status(f"✓ Completed! Total emails sent: {total_sent}")
-            messagebox.showinfo("Success", f"Attendance summaries sent successfully!\nTotal: {total_sent}")
+            pending = self.db.get_outbox_counts().get('pending', 0)
+            self.log_status(f"✓ Completed! Faculty summaries queued: {total_sent}, outbox pending: {pending}")
+            self.log_status("Emails are being delivered in the background and will resume if interrupted.")
+            messagebox.showinfo("Success", f"Attendance summaries queued for delivery!\nFaculty summaries: {total_sent}")
         
         except Exception as e:
             self.log_status(f"✗ Error: {str(e)}")
@@ -0,0 +1,160 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from database import Database
+
+REQUIRED_COLUMNS = ('student_id', 'name', 'email', 'department')
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DETECTION_WIDTH = 800  # ID photos are detected on a copy at most this wide
+
+
+def read_roster(path):
+    """Read a roster CSV with student_id, name, email, department (and optional photo) columns
+
+    Returns (rows, errors); rows are dicts with stripped values.
+    """
+    rows, errors, seen = [], [], set()
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = [c.strip().lower() for c in (reader.fieldnames or [])]
+        missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+        if missing:
+            return [], [f"Roster is missing columns: {', '.join(missing)}"]
+        for line, raw in enumerate(reader, start=2):
+            row = {k.strip().lower(): (v or '').strip() for k, v in raw.items() if k}
+            if not all(row.get(c) for c in REQUIRED_COLUMNS):
+                errors.append(f"Line {line}: empty required field")
+            elif row['student_id'] in seen:
+                errors.append(f"Line {line}: duplicate student_id {row['student_id']}")
+            else:
+                seen.add(row['student_id'])
+                rows.append(row)
+    return rows, errors
+
+
+def find_photos(photo_dir, row):
+    """Photo paths of a roster row: its photo column, <student_id>.jpg, or a <student_id>/ folder"""
+    if row.get('photo'):
+        path = os.path.join(photo_dir, row['photo'])
+        return [path] if os.path.isfile(path) else []
+    folder = os.path.join(photo_dir, row['student_id'])
+    if os.path.isdir(folder):
+        return [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(PHOTO_EXTENSIONS)]
+    for extension in PHOTO_EXTENSIONS:
+        path = os.path.join(photo_dir, row['student_id'] + extension)
+        if os.path.isfile(path):
+            return [path]
+    return []
+
+
+def student_directory_name(name, db_id):
+    """TrainingImage sub-directory of a student, Name.ID as face_recognition_engine expects"""
+    safe_name = "".join(c for c in name if c not in '\\/:*?"<>|').strip() or "Student"
+    return f"{safe_name}.{db_id}"
+
+
+def crop_student_faces(task):
+    """Process-pool worker: crop the largest face of each photo into the student's directory
+
+    task is (db_id, name, photo_paths, training_path); returns (db_id, saved, problems).
+    """
+    from face_detector import get_detector
+
+    db_id, name, photo_paths, training_path = task
+    directory_name = student_directory_name(name, db_id)
+    student_dir = os.path.join(training_path, directory_name)
+    saved, problems = 0, []
+    for number, path in enumerate(photo_paths, 1):
+        image = cv2.imread(path)
+        if image is None:
+            problems.append(f"could not read {os.path.basename(path)}")
+            continue
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        scale = min(1.0, DETECTION_WIDTH / max(gray.shape[:2]))
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        min_side = max(24, min(small.shape[:2]) // 8)
+        faces = get_detector().detect(small, min_size=(min_side, min_side))
+        if len(faces) == 0:
+            problems.append(f"no face found in {os.path.basename(path)}")
+            continue
+
+        x, y, w, h = (int(round(v / scale)) for v in max(faces, key=lambda f: f[2] * f[3]))
+        # Named after the photo, not a running count, so re-runs replace these crops and keep webcam captures
+        os.makedirs(student_dir, exist_ok=True)
+        if cv2.imwrite(os.path.join(student_dir, f"{directory_name}.photo{number}.jpg"), image[y:y+h, x:x+w]):
+            saved += 1
+    return db_id, saved, problems
+
+
+def enroll(roster_path, photo_dir, training_path="TrainingImage", workers=None, train=True, progress=None):
+    """Enroll every student of a roster CSV from their ID photos, then train once
+
+    Students are inserted in one transaction, faces are cropped in a process pool
+    and training runs through training_jobs (waiting for it to finish).
+    progress, if given, is called with a status line. Returns (success, message).
+    """
+    try:
+        started = time.perf_counter()
+        report = progress or print
+        rows, errors = read_roster(roster_path)
+        if not rows:
+            return False, "No valid students in roster" + (f": {errors[0]}" if errors else "")
+
+        inserted, ids = Database().add_students_bulk(
+            [(r['student_id'], r['name'], r['email'], r['department']) for r in rows]
+        )
+        report(f"Added {inserted} new students ({len(rows) - inserted} already registered or conflicting)")
+
+        tasks = []
+        for row in rows:
+            db_id = ids.get(row['student_id'])
+            if db_id is None:
+                errors.append(f"{row['student_id']}: not added (email already used by another student)")
+                continue
+            photos = find_photos(photo_dir, row)
+            if not photos:
+                errors.append(f"{row['student_id']}: no photo found")
+                continue
+            tasks.append((db_id, row['name'], photos, training_path))
+
+        enrolled = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, (db_id, saved, problems) in enumerate(pool.map(crop_student_faces, tasks, chunksize=16), 1):
+                enrolled += saved > 0
+                errors.extend(f"student {db_id}: {p}" for p in problems)
+                if done % 100 == 0 or done == len(tasks):
+                    report(f"Cropped faces for {done}/{len(tasks)} students")
+
+        for error in errors:
+            print(f"[v0] Bulk enrollment: {error}")
+        message = (f"Enrolled {enrolled} of {len(rows)} students in {time.perf_counter() - started:.0f}s"
+                   + (f", {len(errors)} problems" if errors else ""))
+
+        if train and enrolled:
+            from training_jobs import training_runner
+            job = training_runner.submit(on_progress=lambda job: report(job.describe()))
+            success, train_message = job.wait()
+            return success, f"{message}. {train_message}"
+        return enrolled > 0, message
+    except Exception as e:
+        return False, f"Error during bulk enrollment: {str(e)}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Enroll students from a roster CSV and a folder of ID photos")
+    parser.add_argument("roster", help="CSV with student_id, name, email, department and optional photo columns")
+    parser.add_argument("photos", help="folder with <student_id>.jpg photos or <student_id>/ sub-folders")
+    parser.add_argument("--training-path", default="TrainingImage",
+                        help="where crops are written (training reads the engine's TrainingImage)")
+    parser.add_argument("--workers", type=int, default=None, help="face cropping processes (default: CPU count)")
+    parser.add_argument("--no-train", action="store_true", help="skip the training run at the end")
+    args = parser.parse_args()
+
+    success, message = enroll(args.roster, args.photos, args.training_path, args.workers, not args.no_train)
+    print(message)
+    raise SystemExit(0 if success else 1)
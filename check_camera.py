@@ -1,9 +1,10 @@
 
 def camer():
     import cv2
+    from face_detector import get_detector
 
-    # Load the cascade
-    face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
+    # Load the face detector
+    detector = get_detector()
 
     # To capture video from webcam.
     cap = cv2.VideoCapture(0)
@@ -16,7 +17,7 @@ def camer():
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
         # Detect the faces
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5, minSize=(30, 30),flags = cv2.CASCADE_SCALE_IMAGE)
+        faces = detector.detect(gray, min_size=(30, 30))
 
         # Draw the rectangle around each face
         for (x, y, w, h) in faces:
@@ -0,0 +1,65 @@
+import importlib
+import os
+import sys
+import time
+
+# Import-time budget for everything the launcher and its windows import up front
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+
+# Modules on the launcher path
+STARTUP_MODULES = ['app_launcher', 'faculty_login', 'attendance_client', 'admin_dashboard', 'automail_enhanced']
+
+# Heavy libraries that must only load once recognition or training is started
+HEAVY_MODULES = ['cv2', 'numpy', 'pandas', 'PIL']
+
+
+def check_startup():
+    """Import the launcher path and return (seconds, problems)"""
+    started = time.perf_counter()
+    for module in STARTUP_MODULES:
+        importlib.import_module(module)
+    elapsed = time.perf_counter() - started
+
+    from service_registry import loaded_services
+
+    problems = []
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        problems.append(f"imports took {elapsed:.3f}s, budget is {STARTUP_BUDGET_SECONDS:.3f}s")
+    for module in HEAVY_MODULES:
+        if module in sys.modules:
+            problems.append(f"{module} is imported at startup")
+    for name in loaded_services():
+        problems.append(f"service {name} is created at import time")
+
+    return elapsed, problems
+
+
+def time_launcher_window():
+    """Time building the AppLauncher window, or None if no display is available"""
+    import tkinter as tk
+    from app_launcher import AppLauncher
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+
+    started = time.perf_counter()
+    AppLauncher(root)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - started
+    root.destroy()
+    return elapsed
+
+
+if __name__ == "__main__":
+    elapsed, problems = check_startup()
+    print(f"Startup imports: {elapsed:.3f}s (budget {STARTUP_BUDGET_SECONDS:.3f}s)")
+
+    window_time = time_launcher_window()
+    if window_time is not None:
+        print(f"Launcher window: {window_time:.3f}s")
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
@@ -7,30 +7,12 @@ import json
 # Database file path
 DB_PATH = "attendance_system.db"
 
-class Database:
-    """Database management class for the attendance system"""
-    
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
-        self.init_db()
-    
-    def connect(self):
-        """Connect to the database"""
-        self.conn = sqlite3.connect(DB_PATH)
-        self.cursor = self.conn.cursor()
-    
-    def disconnect(self):
-        """Disconnect from the database"""
-        if self.conn:
-            self.conn.close()
-    
-    def init_db(self):
-        """Initialize database with all required tables"""
-        self.connect()
-        
-        # Create Faculties table
-        self.cursor.execute('''
+# Schema migrations, applied in order. PRAGMA user_version stores how many of them
+# a database file has already had applied.
+MIGRATIONS = [
+    # 1: core tables (IF NOT EXISTS so databases created before versioning upgrade cleanly)
+    [
+        '''
             CREATE TABLE IF NOT EXISTS faculties (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -40,10 +22,8 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_active BOOLEAN DEFAULT 1
             )
-        ''')
-        
-        # Create Students table
-        self.cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS students (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 student_id TEXT UNIQUE NOT NULL,
@@ -53,10 +33,8 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_active BOOLEAN DEFAULT 1
             )
-        ''')
-        
-        # Create Timetables table
-        self.cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS timetables (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 faculty_id INTEGER NOT NULL,
@@ -68,10 +46,8 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (faculty_id) REFERENCES faculties(id)
             )
-        ''')
-        
-        # Create Facial Encodings table
-        self.cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS facial_encodings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 student_id INTEGER NOT NULL,
@@ -79,10 +55,8 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (student_id) REFERENCES students(id)
             )
-        ''')
-        
-        # Create Attendance table
-        self.cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS attendance (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 student_id INTEGER NOT NULL,
@@ -93,10 +67,8 @@ class Database:
                 FOREIGN KEY (student_id) REFERENCES students(id),
                 FOREIGN KEY (timetable_id) REFERENCES timetables(id)
             )
-        ''')
-        
-        # Create Attendance Sessions table
-        self.cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS attendance_sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 faculty_id INTEGER NOT NULL,
@@ -109,10 +81,87 @@ class Database:
                 FOREIGN KEY (faculty_id) REFERENCES faculties(id),
                 FOREIGN KEY (timetable_id) REFERENCES timetables(id)
             )
-        ''')
-        
-        self.conn.commit()
-        self.disconnect()
+        '''
+    ],
+    # 2: email outbox
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT UNIQUE,
+                recipient_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                html_body TEXT,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                claimed_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            )
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_status
+            ON email_outbox (status, next_attempt_at)
+        '''
+    ],
+    # 3: index for campus-wide schedule queries
+    [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_timetables_day_start
+            ON timetables (day_of_week COLLATE NOCASE, start_time)
+        '''
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+class Database:
+    """Database management class for the attendance system"""
+    
+    # Bumped whenever timetables change so cached schedules know to rebuild
+    timetable_revision = 0
+    
+    def __init__(self):
+        self.conn = None
+        self.cursor = None
+        self.init_db()
+    
+    def connect(self):
+        """Connect to the database"""
+        self.conn = sqlite3.connect(DB_PATH)
+        self.cursor = self.conn.cursor()
+    
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.conn:
+            self.conn.close()
+    
+    def init_db(self):
+        """Bring the database schema up to SCHEMA_VERSION
+
+        An up-to-date database costs a single PRAGMA read; migrations only run
+        once per database file.
+        """
+        self.connect()
+        try:
+            version = self.cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            
+            self.cursor.execute('BEGIN IMMEDIATE')
+            # Another process may have migrated while we waited for the lock
+            version = self.cursor.execute('PRAGMA user_version').fetchone()[0]
+            for number in range(version, SCHEMA_VERSION):
+                for statement in MIGRATIONS[number]:
+                    self.cursor.execute(statement)
+            self.cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.conn.commit()
+            print(f"[v0] Database schema migrated from version {version} to {SCHEMA_VERSION}")
+        finally:
+            self.disconnect()
     
     def hash_passcode(self, passcode):
         """Hash a passcode using bcrypt"""
@@ -181,6 +230,34 @@ class Database:
             self.disconnect()
             raise Exception(f"Student with this ID or email already exists: {e}")
     
+    def add_students_bulk(self, students):
+        """Add many students in one transaction, skipping existing student IDs or emails
+        
+        students is a list of (student_id, name, email, department) tuples. Returns
+        (inserted_count, {student_id: database ID}) covering new and existing students.
+        """
+        self.connect()
+        try:
+            before = self.conn.total_changes
+            self.cursor.executemany('''
+                INSERT OR IGNORE INTO students (student_id, name, email, department)
+                VALUES (?, ?, ?, ?)
+            ''', students)
+            self.conn.commit()
+            inserted = self.conn.total_changes - before
+            
+            ids = {}
+            student_ids = [s[0] for s in students]
+            for start in range(0, len(student_ids), 500):  # stay under SQLite's bound-parameter limit
+                chunk = student_ids[start:start + 500]
+                self.cursor.execute(
+                    f'SELECT student_id, id FROM students WHERE student_id IN ({",".join("?" * len(chunk))})', chunk
+                )
+                ids.update(self.cursor.fetchall())
+            return inserted, ids
+        finally:
+            self.disconnect()
+    
     def get_student_by_id(self, student_id):
         """Get student by database ID"""
         self.connect()
@@ -216,6 +293,7 @@ class Database:
         self.conn.commit()
         timetable_id = self.cursor.lastrowid
         self.disconnect()
+        Database.timetable_revision += 1
         return timetable_id
     
     def get_timetable_by_id(self, timetable_id):
@@ -226,6 +304,49 @@ class Database:
         self.disconnect()
         return result
     
+    def get_all_timetables(self):
+        """Get all timetables"""
+        self.connect()
+        self.cursor.execute('SELECT * FROM timetables')
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return results
+    
+    def get_timetables_active_at(self, day_of_week, time_str):
+        """Get all timetables running at a day and "HH:MM" time, with the faculty name"""
+        self.connect()
+        self.cursor.execute('''
+            SELECT t.*, f.name as faculty_name FROM timetables t
+            JOIN faculties f ON t.faculty_id = f.id
+            WHERE t.day_of_week = ? COLLATE NOCASE AND t.start_time <= ? AND t.end_time >= ?
+            ORDER BY t.room_number
+        ''', (day_of_week, time_str, time_str))
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return results
+    
+    def get_timetables_starting_between(self, ranges):
+        """Get all timetables starting inside any of the (day_of_week, after, until) ranges
+
+        start_time must be strictly after "after" and at most "until", both "HH:MM"
+        (pass "" as "after" to include midnight). Results come with the faculty name.
+        """
+        if not ranges:
+            return []
+        conditions = ' OR '.join(
+            ['(t.day_of_week = ? COLLATE NOCASE AND t.start_time > ? AND t.start_time <= ?)'] * len(ranges)
+        )
+        params = [value for day_range in ranges for value in day_range]
+        self.connect()
+        self.cursor.execute(f'''
+            SELECT t.*, f.name as faculty_name FROM timetables t
+            JOIN faculties f ON t.faculty_id = f.id
+            WHERE {conditions}
+        ''', params)
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return results
+    
     def get_faculty_timetables(self, faculty_id):
         """Get all timetables for a faculty"""
         self.connect()
@@ -287,6 +408,36 @@ class Database:
         self.disconnect()
         return results
     
+    def get_mail_run_records(self):
+        """Get every attendance record of active faculties with its class and faculty in one query
+
+        Rows start with the same columns as get_attendance_by_session, followed by
+        faculty id, faculty name, faculty email and class name. Also returns the
+        class size of each timetable, {timetable_id: total_students} from its
+        latest attendance session (classes without a session are missing).
+        """
+        self.connect()
+        self.cursor.execute('''
+            SELECT a.id, a.student_id, a.timetable_id, a.timestamp, a.status, a.confidence_score,
+                   s.student_id as student_code, s.name, s.email,
+                   f.id as faculty_id, f.name as faculty_name, f.email as faculty_email, t.class_name
+            FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            JOIN timetables t ON a.timetable_id = t.id
+            JOIN faculties f ON t.faculty_id = f.id
+            WHERE f.is_active = 1
+            ORDER BY f.id, t.id, a.timestamp DESC
+        ''')
+        results = self.cursor.fetchall()
+        self.cursor.execute('''
+            SELECT timetable_id, total_students FROM attendance_sessions
+            WHERE id IN (SELECT MAX(id) FROM attendance_sessions
+                         WHERE total_students > 0 GROUP BY timetable_id)
+        ''')
+        class_sizes = dict(self.cursor.fetchall())
+        self.disconnect()
+        return results, class_sizes
+    
     # Attendance session operations
     def create_session(self, faculty_id, timetable_id, total_students):
         """Create a new attendance session"""
@@ -318,6 +469,85 @@ class Database:
         result = self.cursor.fetchone()
         self.disconnect()
         return result
+    
+    # Email outbox operations
+    def enqueue_emails(self, messages):
+        """Queue emails in the outbox, skipping duplicates. Returns the number queued.
+
+        Each message is a tuple of (dedup_key, recipient_email, subject, body, html_body).
+        """
+        self.connect()
+        try:
+            before = self.conn.total_changes
+            self.cursor.executemany('''
+                INSERT OR IGNORE INTO email_outbox (dedup_key, recipient_email, subject, body, html_body)
+                VALUES (?, ?, ?, ?, ?)
+            ''', messages)
+            self.conn.commit()
+            return self.conn.total_changes - before
+        finally:
+            self.disconnect()
+    
+    def claim_pending_emails(self, limit, lease_seconds=300):
+        """Claim a batch of due emails for sending.
+
+        Messages left in 'sending' by a dispatcher that died are released back to
+        'pending' once their lease has expired, so delivery resumes after a crash.
+        """
+        self.connect()
+        try:
+            self.cursor.execute('BEGIN IMMEDIATE')
+            self.cursor.execute('''
+                UPDATE email_outbox SET status = 'pending'
+                WHERE status = 'sending' AND claimed_at < datetime('now', ?)
+            ''', (f'-{int(lease_seconds)} seconds',))
+            self.cursor.execute('''
+                SELECT id, recipient_email, subject, body, html_body, attempts FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY id
+                LIMIT ?
+            ''', (limit,))
+            results = self.cursor.fetchall()
+            self.cursor.executemany('''
+                UPDATE email_outbox
+                SET status = 'sending', claimed_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+                WHERE id = ?
+            ''', [(r[0],) for r in results])
+            self.conn.commit()
+            return results
+        finally:
+            self.disconnect()
+    
+    def mark_email_sent(self, outbox_id):
+        """Mark an outbox email as delivered"""
+        self.connect()
+        self.cursor.execute('''
+            UPDATE email_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE id = ?
+        ''', (outbox_id,))
+        self.conn.commit()
+        self.disconnect()
+    
+    def mark_email_failed(self, outbox_id, error, retry_delay_seconds=60, max_attempts=5):
+        """Record a failed delivery and schedule a retry until max_attempts is reached"""
+        self.connect()
+        self.cursor.execute('''
+            UPDATE email_outbox
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                last_error = ?,
+                next_attempt_at = datetime('now', ?)
+            WHERE id = ?
+        ''', (max_attempts, error, f'+{int(retry_delay_seconds)} seconds', outbox_id))
+        self.conn.commit()
+        self.disconnect()
+    
+    def get_outbox_counts(self):
+        """Get the number of outbox emails per status"""
+        self.connect()
+        self.cursor.execute('SELECT status, COUNT(*) FROM email_outbox GROUP BY status')
+        results = dict(self.cursor.fetchall())
+        self.disconnect()
+        return results
 
 # Initialize database on import
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import argparse
+import signal
+import time
+from email_service import email_service
+
+class EmailDispatcher:
+    """Background dispatcher that drains the email outbox
+
+    Runs as a separate process so queued mail survives the GUI closing. Messages
+    are claimed in batches, sent over a single SMTP connection per batch, rate
+    limited, and retried with exponential backoff until max_attempts is reached.
+    """
+
+    def __init__(self, rate_per_minute=30, batch_size=20, max_attempts=5, retry_delay=60,
+                 poll_interval=5, lease_seconds=300):
+        self.rate_per_minute = rate_per_minute
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.db = email_service.db
+        self.is_running = False
+        self.sent_count = 0
+        self.failed_count = 0
+        self._last_send = 0.0
+
+    def _wait_for_rate_limit(self):
+        """Sleep just long enough to stay under rate_per_minute"""
+        if self.rate_per_minute <= 0:
+            return
+        interval = 60.0 / self.rate_per_minute
+        wait = self._last_send + interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def _retry_delay_for(self, attempts):
+        """Exponential backoff based on the number of attempts so far"""
+        return self.retry_delay * (2 ** max(attempts - 1, 0))
+
+    def dispatch_batch(self):
+        """Claim and send one batch. Returns the number of messages claimed"""
+        batch = self.db.claim_pending_emails(self.batch_size, self.lease_seconds)
+
+        if not batch:
+            return 0
+
+        try:
+            server = email_service.open_smtp()
+        except Exception as e:
+            print(f"[v0] SMTP connection failed: {e}")
+            for outbox_id, _, _, _, _, attempts in batch:
+                self.db.mark_email_failed(outbox_id, f"SMTP connection failed: {e}",
+                                          self._retry_delay_for(attempts + 1), self.max_attempts)
+                self.failed_count += 1
+            return len(batch)
+
+        try:
+            for outbox_id, recipient_email, subject, body, html_body, attempts in batch:
+                self._wait_for_rate_limit()
+                try:
+                    msg = email_service.build_message(recipient_email, subject, body, html_body)
+                    server.send_message(msg)
+                    self.db.mark_email_sent(outbox_id)
+                    self.sent_count += 1
+                except Exception as e:
+                    print(f"[v0] Failed to send outbox email {outbox_id} to {recipient_email}: {e}")
+                    self.db.mark_email_failed(outbox_id, str(e),
+                                              self._retry_delay_for(attempts + 1), self.max_attempts)
+                    self.failed_count += 1
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+        return len(batch)
+
+    def run(self, until_empty=False):
+        """Drain the outbox until stopped, or until nothing is due if until_empty is set"""
+        self.is_running = True
+        print("[v0] Email dispatcher started")
+
+        while self.is_running:
+            claimed = self.dispatch_batch()
+
+            if claimed == 0:
+                if until_empty:
+                    counts = self.db.get_outbox_counts()
+                    if not counts.get('pending') and not counts.get('sending'):
+                        break
+                time.sleep(self.poll_interval)
+
+        print(f"[v0] Email dispatcher stopped. Sent: {self.sent_count}, Failed attempts: {self.failed_count}")
+
+    def stop(self, *args):
+        """Stop after the current message"""
+        self.is_running = False
+
+
+def main():
+    """Main entry point for the email dispatcher process"""
+    parser = argparse.ArgumentParser(description="Deliver queued attendance emails")
+    parser.add_argument('--rate', type=int, default=30, help="maximum emails per minute")
+    parser.add_argument('--batch-size', type=int, default=20, help="emails claimed per SMTP connection")
+    parser.add_argument('--max-attempts', type=int, default=5, help="attempts before an email is marked failed")
+    parser.add_argument('--until-empty', action='store_true', help="exit once no email is pending")
+    args = parser.parse_args()
+
+    dispatcher = EmailDispatcher(
+        rate_per_minute=args.rate,
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts
+    )
+    signal.signal(signal.SIGTERM, dispatcher.stop)
+    signal.signal(signal.SIGINT, dispatcher.stop)
+    dispatcher.run(until_empty=args.until_empty)
+
+
+if __name__ == "__main__":
+    main()
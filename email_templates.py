@@ -0,0 +1,218 @@
+import html
+import re
+from functools import lru_cache
+
+# Placeholders look like {{ name }}
+_PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class Safe(str):
+    """String that is already valid HTML and must not be escaped again"""
+
+
+class CompiledTemplate:
+    """Template parsed once into literal chunks and named slots
+
+    The source is split a single time at construction. Rendering only fills the
+    slots and joins the chunks, and bind() pre-fills the slots that stay the same
+    across many renders (class name, session time, ...) into a smaller template.
+    """
+
+    def __init__(self, source, escape=False, _parts=None):
+        self.escape = escape
+        # Even indexes are literal text, odd indexes are slot names
+        self.parts = _parts if _parts is not None else _PLACEHOLDER.split(source)
+        self.slots = self.parts[1::2]
+
+    def _convert(self, value):
+        """Convert a slot value to text, escaping it for HTML templates"""
+        if self.escape and not isinstance(value, Safe):
+            return html.escape(str(value))
+        return str(value)
+
+    def render(self, **values):
+        """Render the template with all remaining slots filled"""
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = self._convert(values[parts[i]])
+        return ''.join(parts)
+
+    def bind(self, **values):
+        """Return a new template with the given slots filled in and literals merged"""
+        parts = [self.parts[0]]
+        for i in range(1, len(self.parts), 2):
+            name = self.parts[i]
+            if name in values:
+                parts[-1] += self._convert(values[name]) + self.parts[i + 1]
+            else:
+                parts.extend((name, self.parts[i + 1]))
+        return CompiledTemplate(None, self.escape, _parts=parts)
+
+
+FACULTY_SUMMARY_ROW_HTML = CompiledTemplate('''
+            <tr>
+                <td style="padding: 8px; border-bottom: 1px solid #ddd;">{{ name }}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #ddd;">{{ email }}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #ddd; color: #27ae60;">Present</td>
+                <td style="padding: 8px; border-bottom: 1px solid #ddd;">{{ timestamp }}</td>
+            </tr>
+            ''', escape=True)
+
+FACULTY_SUMMARY_HTML = CompiledTemplate('''
+        <html>
+            <head>
+                <style>
+                    body { font-family: Arial, sans-serif; color: #333; }
+                    .container { max-width: 800px; margin: 0 auto; padding: 20px; }
+                    .header { background-color: #2c3e50; color: white; padding: 20px; border-radius: 5px; }
+                    .content { margin: 20px 0; }
+                    .stats { display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 15px; margin: 20px 0; }
+                    .stat-box { background-color: #ecf0f1; padding: 15px; border-radius: 5px; text-align: center; }
+                    .stat-number { font-size: 24px; font-weight: bold; color: #2c3e50; }
+                    .stat-label { color: #7f8c8d; font-size: 12px; }
+                    table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+                    th { background-color: #3498db; color: white; padding: 10px; text-align: left; }
+                    .footer { background-color: #ecf0f1; padding: 15px; border-radius: 5px; text-align: center; color: #7f8c8d; font-size: 12px; }
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="header">
+                        <h1>Attendance Summary Report</h1>
+                        <p>Session ID: {{ session_id }}</p>
+                    </div>
+
+                    <div class="content">
+                        <h2>Class Information</h2>
+                        <p><strong>Faculty:</strong> {{ faculty_name }}</p>
+                        <p><strong>Class:</strong> {{ class_name }}</p>
+                        <p><strong>Date & Time:</strong> {{ date_time }}</p>
+                    </div>
+
+                    <div class="stats">
+                        <div class="stat-box">
+                            <div class="stat-number">{{ total_students }}</div>
+                            <div class="stat-label">Total Students</div>
+                        </div>
+                        <div class="stat-box">
+                            <div class="stat-number">{{ present_students }}</div>
+                            <div class="stat-label">Present</div>
+                        </div>
+                        <div class="stat-box">
+                            <div class="stat-number">{{ absent_students }}</div>
+                            <div class="stat-label">Absent</div>
+                        </div>
+                    </div>
+
+                    <div class="content">
+                        <h3>Attendance Percentage: {{ attendance_percentage }}%</h3>
+                    </div>
+
+                    <div class="content">
+                        <h2>Attendance Details</h2>
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>Student Name</th>
+                                    <th>Email</th>
+                                    <th>Status</th>
+                                    <th>Time</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {{ student_rows }}
+                            </tbody>
+                        </table>
+                    </div>
+
+                    <div class="footer">
+                        <p>This is an automated email from the Contactless Attendance System.</p>
+                        <p>Please do not reply to this email.</p>
+                    </div>
+                </div>
+            </body>
+        </html>
+        ''', escape=True)
+
+FACULTY_SUMMARY_ROW_TEXT = CompiledTemplate('- {{ name }} ({{ email }}): Present at {{ timestamp }}')
+
+FACULTY_SUMMARY_TEXT = CompiledTemplate('''
+Attendance Summary Report
+Session ID: {{ session_id }}
+
+Faculty: {{ faculty_name }}
+Class: {{ class_name }}
+Date & Time: {{ date_time }}
+
+Total Students: {{ total_students }}
+Present: {{ present_students }}
+Absent: {{ absent_students }}
+
+Attendance Details:
+{{ student_rows }}
+
+This is an automated email from the Contactless Attendance System.
+            ''')
+
+STUDENT_CONFIRMATION_TEXT = CompiledTemplate('''
+Dear {{ student_name }},
+
+Your attendance has been marked for the class: {{ class_name }}
+
+Date & Time: {{ date_time }}
+Status: Present
+
+If you believe this is incorrect, please contact your faculty member.
+
+Best regards,
+Attendance System
+                ''')
+
+STUDENT_CONFIRMATION_HTML = CompiledTemplate('''
+                <html>
+                    <body style="font-family: Arial, sans-serif;">
+                        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                            <h2>Attendance Confirmation</h2>
+                            <p>Dear {{ student_name }},</p>
+                            <p>Your attendance has been marked for the class: <strong>{{ class_name }}</strong></p>
+                            <p><strong>Date & Time:</strong> {{ date_time }}</p>
+                            <p><strong>Status:</strong> <span style="color: #27ae60;">Present</span></p>
+                            <p>If you believe this is incorrect, please contact your faculty member.</p>
+                            <p>Best regards,<br>Attendance System</p>
+                        </div>
+                    </body>
+                </html>
+                ''', escape=True)
+
+STUDENT_CONFIRMATION_SUBJECT = CompiledTemplate('Attendance Confirmation - {{ class_name }}')
+
+ADMIN_REPORT_TEXT = CompiledTemplate('''
+Daily Attendance Report
+Generated: {{ date_time }}
+
+Total Sessions: {{ total_sessions }}
+Total Students Marked: {{ total_marked }}
+Average Attendance: {{ average_attendance }}% (over {{ classes_averaged }} classes with a recorded size)
+
+This is an automated report from the Attendance System.
+            ''')
+
+
+def render_rows(row_template, rows, separator=''):
+    """Render one row template per (name, email, timestamp) tuple and join them"""
+    return separator.join([row_template.render(name=name, email=email, timestamp=timestamp)
+                           for name, email, timestamp in rows])
+
+
+@lru_cache(maxsize=256)
+def bind_student_confirmation(class_name, date_time):
+    """Get the student confirmation templates with the per-class parts pre-filled
+
+    Cached per class and session time, so a class of any size only binds once and
+    each student render fills in a single name slot.
+    """
+    return (
+        STUDENT_CONFIRMATION_SUBJECT.render(class_name=class_name),
+        STUDENT_CONFIRMATION_TEXT.bind(class_name=class_name, date_time=date_time),
+        STUDENT_CONFIRMATION_HTML.bind(class_name=class_name, date_time=date_time)
+    )
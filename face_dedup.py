@@ -0,0 +1,120 @@
+import argparse
+import os
+import re
+import cv2
+import numpy as np
+
+# Hashes closer than this many bits (of 64) are treated as the same pose and lighting
+MAX_HASH_DISTANCE = 6
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def dhash(face, hash_size=8):
+    """64-bit difference hash of a grayscale (or BGR) face crop
+
+    The crop is shrunk to (hash_size + 1) x hash_size and each bit records whether a
+    pixel is brighter than its right neighbour, so the hash ignores the crop size,
+    overall brightness and JPEG noise but changes with pose and expression.
+    """
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(face, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class FaceDeduplicator:
+    """Keeps a face crop only if it differs from every crop kept so far
+
+    add() returns True for a new-looking crop (and remembers it), False for a
+    near-duplicate of an earlier one, e.g. consecutive frames of a still face.
+    """
+
+    def __init__(self, max_distance=MAX_HASH_DISTANCE):
+        self.max_distance = max_distance
+        self.hashes = []
+        self.skipped = 0
+
+    def is_duplicate(self, face_hash):
+        return any(hamming(face_hash, kept) <= self.max_distance for kept in self.hashes)
+
+    def add(self, face):
+        """Remember a face crop unless it is a near-duplicate; returns whether it was kept"""
+        face_hash = dhash(face)
+        if self.is_duplicate(face_hash):
+            self.skipped += 1
+            return False
+        self.hashes.append(face_hash)
+        return True
+
+    @property
+    def kept(self):
+        return len(self.hashes)
+
+
+def _sample_number(filename):
+    """Sort key for Name.ID.N.jpg captures, so the earliest sample of a pose is kept"""
+    numbers = re.findall(r'\d+', filename)
+    return (int(numbers[-1]) if numbers else 0, filename)
+
+
+def dedup_files(paths, max_distance=MAX_HASH_DISTANCE, dry_run=False):
+    """Delete near-duplicate images among paths (one student), returns (kept, removed)"""
+    deduplicator = FaceDeduplicator(max_distance)
+    removed = 0
+    for path in paths:
+        face = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if face is None:
+            print(f"[v0] Could not read image: {path}")
+            continue
+        if not deduplicator.add(face):
+            removed += 1
+            if not dry_run:
+                os.remove(path)
+    return deduplicator.kept, removed
+
+
+def dedup_training_images(path="TrainingImage", max_distance=MAX_HASH_DISTANCE, dry_run=False):
+    """Remove near-duplicate captures from every student in a training directory
+
+    Handles both layouts: Name.StudentID/ subdirectories (face_recognition_engine)
+    and flat Name.ID.N.jpg files (Capture_Image.py), grouped by ID.
+    Returns {student: (kept, removed)}.
+    """
+    groups = {}
+    for entry in sorted(os.listdir(path)):
+        entry_path = os.path.join(path, entry)
+        if os.path.isdir(entry_path):
+            files = [f for f in os.listdir(entry_path) if f.lower().endswith(IMAGE_EXTENSIONS)]
+            groups[entry] = [os.path.join(entry_path, f) for f in files]
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            parts = entry.split('.')
+            key = '.'.join(parts[:2]) if len(parts) >= 4 else entry
+            groups.setdefault(key, []).append(entry_path)
+
+    results = {}
+    for student, paths in groups.items():
+        paths = sorted(paths, key=lambda p: _sample_number(os.path.basename(p)))
+        results[student] = dedup_files(paths, max_distance, dry_run)
+        kept, removed = results[student]
+        print(f"[v0] {student}: kept {kept}, {'would remove' if dry_run else 'removed'} {removed}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove near-duplicate face captures from the training images")
+    parser.add_argument("--path", default="TrainingImage", help="training image directory")
+    parser.add_argument("--max-distance", type=int, default=MAX_HASH_DISTANCE,
+                        help="hashes within this many bits count as duplicates")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    args = parser.parse_args()
+
+    results = dedup_training_images(args.path, args.max_distance, args.dry_run)
+    kept = sum(k for k, _ in results.values())
+    removed = sum(r for _, r in results.values())
+    print(f"Students: {len(results)}, kept {kept} images, {'would remove' if args.dry_run else 'removed'} {removed}")
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from face_detector import find_cascade
+
+# Canonical face size fed to LBPH, for training and recognition alike
+FACE_SIZE = (100, 100)
+EYE_CASCADE_FILE = "haarcascade_eye.xml"
+
+
+class FacePreprocessor:
+    """Normalizes grayscale face crops to a fixed size with CLAHE, optionally levelling the eyes
+
+    process() writes into a buffer allocated once per instance and returns it, so
+    callers that keep the result (e.g. training) must copy it. Instances are not
+    thread-safe; use get_preprocessor() for one per thread.
+    """
+
+    def __init__(self, size=FACE_SIZE, clip_limit=2.0, tile_grid=(4, 4), align_eyes=False):
+        self.size = tuple(size)
+        self.align_eyes = align_eyes
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid)
+        self._resized = np.empty((self.size[1], self.size[0]), np.uint8)
+        self._output = np.empty((self.size[1], self.size[0]), np.uint8)
+        self._eye_cascade = None
+
+    def _eye_angle(self, face):
+        """Angle in degrees between the two eyes of a resized face, or None if they are not found"""
+        if self._eye_cascade is None:
+            self._eye_cascade = cv2.CascadeClassifier(find_cascade(EYE_CASCADE_FILE))
+
+        upper = face[:face.shape[0] // 2]
+        eyes = self._eye_cascade.detectMultiScale(upper, 1.1, 5, minSize=(self.size[0] // 8, self.size[0] // 8))
+        if len(eyes) < 2:
+            return None
+
+        # Largest two detections, ordered left to right
+        eyes = sorted(sorted(eyes, key=lambda e: e[2] * e[3], reverse=True)[:2], key=lambda e: e[0])
+        (x1, y1, w1, h1), (x2, y2, w2, h2) = eyes
+        dx = (x2 + w2 / 2) - (x1 + w1 / 2)
+        dy = (y2 + h2 / 2) - (y1 + h1 / 2)
+        if dx <= 0:
+            return None
+        angle = float(np.degrees(np.arctan2(dy, dx)))
+        return angle if abs(angle) <= 30 else None
+
+    def process(self, face):
+        """Get the canonical version of a grayscale (or BGR) face crop"""
+        if face.ndim == 3:
+            face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        interpolation = cv2.INTER_AREA if face.shape[1] > self.size[0] else cv2.INTER_LINEAR
+        cv2.resize(face, self.size, dst=self._resized, interpolation=interpolation)
+
+        if self.align_eyes:
+            angle = self._eye_angle(self._resized)
+            if angle:
+                center = (self.size[0] / 2, self.size[1] / 2)
+                rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+                aligned = cv2.warpAffine(self._resized, rotation, self.size, borderMode=cv2.BORDER_REPLICATE)
+                self._resized[...] = aligned
+
+        self.clahe.apply(self._resized, self._output)
+        return self._output
+
+
+_local = threading.local()
+
+
+def get_preprocessor(align_eyes=False):
+    """Get this thread's preprocessor"""
+    preprocessors = getattr(_local, 'preprocessors', None)
+    if preprocessors is None:
+        preprocessors = _local.preprocessors = {}
+    preprocessor = preprocessors.get(align_eyes)
+    if preprocessor is None:
+        preprocessor = preprocessors[align_eyes] = FacePreprocessor(align_eyes=align_eyes)
+    return preprocessor
+
+
+def settings_path(model_path):
+    """Path of the file recording how the faces of a YAML model were preprocessed"""
+    return os.path.splitext(model_path)[0] + ".preprocess.json"
+
+
+def save_settings(model_path, preprocessed, align_eyes=False):
+    """Record next to a YAML model whether it was trained on preprocessed faces (atomically)"""
+    settings = {'preprocessed': bool(preprocessed), 'face_size': list(FACE_SIZE), 'align_eyes': bool(align_eyes)}
+    path = settings_path(model_path)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_settings(model_path):
+    """Preprocessing settings of a YAML model; models without a settings file were trained on raw crops"""
+    try:
+        with open(settings_path(model_path), 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    return {'preprocessed': bool(settings.get('preprocessed')), 'align_eyes': bool(settings.get('align_eyes'))}
+
+
+def preparer_for(settings):
+    """Function that prepares a query crop the way a model with these settings expects, or None"""
+    if not settings.get('preprocessed'):
+        return None
+    align_eyes = settings.get('align_eyes', False)
+    return lambda face: get_preprocessor(align_eyes).process(face)
+
+
+def benchmark(num_identities=50, images_per_identity=10, queries=200, seed=0):
+    """Compare predict time on raw crops of mixed sizes against preprocessed crops"""
+    import os
+    import tempfile
+    import lbph_model
+
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(60, 260, size=queries)
+    crops = [cv2.GaussianBlur((rng.random((s, s)) * 255).astype(np.uint8), (5, 5), 0) for s in sizes]
+    preprocessor = FacePreprocessor()
+
+    gallery = [cv2.GaussianBlur((rng.random(FACE_SIZE[::-1]) * 255).astype(np.uint8), (5, 5), 0)
+               for _ in range(num_identities * images_per_identity)]
+    histograms = np.vstack([lbph_model.compute_histogram(face) for face in gallery])
+    labels = np.repeat(np.arange(num_identities), images_per_identity)
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.lbph")
+    lbph_model.save_model(path, histograms, labels)
+    model = lbph_model.load_model(path)
+
+    def timed(prepare):
+        times = []
+        for crop in crops:
+            started = time.perf_counter()
+            model.predict(prepare(crop))
+            times.append((time.perf_counter() - started) * 1000)
+        return np.mean(times), np.std(times), np.max(times)
+
+    raw = timed(lambda crop: crop)
+    processed = timed(preprocessor.process)
+    print(f"Gallery: {len(labels)} faces, queries: {queries} crops of {sizes.min()}-{sizes.max()} px")
+    print(f"Raw crops:          mean {raw[0]:6.2f} ms  std {raw[1]:5.2f} ms  max {raw[2]:6.2f} ms")
+    print(f"Preprocessed crops: mean {processed[0]:6.2f} ms  std {processed[1]:5.2f} ms  max {processed[2]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
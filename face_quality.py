@@ -0,0 +1,63 @@
+import cv2
+
+class FaceQualityGate:
+    """Cheap quality checks that reject face crops which would not be recognized anyway
+
+    Checks, in order of cost: box size, aspect ratio (profiles and half-cropped
+    boxes are narrow or wide), mean brightness, and sharpness as the variance of
+    the Laplacian on a fixed-size copy (so it does not depend on the box size).
+    """
+
+    SHARPNESS_SIZE = 64
+
+    def __init__(self, min_size=32, aspect_range=(0.75, 1.33), brightness_range=(40, 220), min_sharpness=30.0):
+        self.min_size = min_size
+        self.aspect_range = aspect_range
+        self.brightness_range = brightness_range
+        self.min_sharpness = min_sharpness
+        self.checked = 0
+        self.rejected = {}  # reason -> count
+
+    def measure(self, face):
+        """Get the quality metrics of a grayscale face crop"""
+        height, width = face.shape[:2]
+        small = cv2.resize(face, (self.SHARPNESS_SIZE, self.SHARPNESS_SIZE), interpolation=cv2.INTER_AREA)
+        return {
+            'size': min(width, height),
+            'aspect': width / height if height else 0.0,
+            'brightness': float(small.mean()),
+            'sharpness': float(cv2.Laplacian(small, cv2.CV_32F).var()),
+        }
+
+    def check(self, face):
+        """Check a grayscale face crop, returns (passed, reason)"""
+        self.checked += 1
+        height, width = face.shape[:2]
+
+        if min(width, height) < self.min_size:
+            reason = "too small"
+        elif not self.aspect_range[0] <= width / height <= self.aspect_range[1]:
+            reason = "bad aspect ratio"
+        else:
+            metrics = self.measure(face)
+            if not self.brightness_range[0] <= metrics['brightness'] <= self.brightness_range[1]:
+                reason = "too dark" if metrics['brightness'] < self.brightness_range[0] else "too bright"
+            elif metrics['sharpness'] < self.min_sharpness:
+                reason = "blurred"
+            else:
+                return True, "ok"
+
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return False, reason
+
+    @property
+    def rejected_count(self):
+        """Number of crops rejected so far"""
+        return sum(self.rejected.values())
+
+    def summary(self):
+        """One-line summary of the checks so far"""
+        if not self.checked:
+            return "No faces checked"
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.rejected.items()))
+        return f"Rejected {self.rejected_count} of {self.checked} faces" + (f" ({reasons})" if reasons else "")
@@ -3,48 +3,480 @@ import numpy as np
 import os
 from pathlib import Path
 from database import Database
+from service_registry import register_service
+import lbph_model
+from model_registry import model_registry
+from motion_gate import MotionGate
+from face_detector import get_detector, detect_tiled, non_max_suppression
+from room_roi import room_roi_config, to_pixel_rects
+from face_quality import FaceQualityGate
+import face_preprocess
+from face_preprocess import get_preprocessor, FACE_SIZE
+from face_dedup import FaceDeduplicator
+from image_sink import AsyncImageWriter
+import gallery_condense
 import time
 from datetime import datetime
 import json
 
+# Result row of recognize_batch: student database ID (-1 if unknown), LBPH distance, below threshold
+RECOGNITION_DTYPE = np.dtype([('student_id', np.int64), ('distance', np.float64), ('accepted', np.bool_)])
+
+
+def label_array(label_mapping):
+    """Build an array indexed by label holding the student database ID (-1 where unmapped)"""
+    labels = {int(label): int(student_id) for label, student_id in label_mapping.items()}
+    result = np.full(max(labels) + 1 if labels else 0, -1, np.int64)
+    for label, student_id in labels.items():
+        if label >= 0:
+            result[label] = student_id
+    return result
+
+
+def recognize_faces_batch(recognizer, gray, boxes, label_to_student=None, threshold=40, prepare=None):
+    """Recognize the (x, y, w, h) boxes of a grayscale image with an LBPH recognizer
+
+    label_to_student maps labels to student IDs (None keeps the labels as IDs) and
+    prepare normalizes each crop before prediction. Returns a RECOGNITION_DTYPE array.
+    """
+    results = np.zeros(len(boxes), RECOGNITION_DTYPE)
+    results['student_id'] = -1
+    results['distance'] = np.inf
+    if len(boxes) == 0:
+        return results
+
+    crops = [gray[y:y+h, x:x+w] for (x, y, w, h) in boxes]
+    if hasattr(recognizer, 'predict_batch'):
+        labels, distances = recognizer.predict_batch(crops, prepare)
+    else:
+        predictions = [recognizer.predict(prepare(crop) if prepare else crop) for crop in crops]
+        labels = np.array([p[0] for p in predictions], np.int64)
+        distances = np.array([p[1] for p in predictions], np.float64)
+
+    if label_to_student is None:
+        student_ids = labels
+    else:
+        student_ids = np.full(len(labels), -1, np.int64)
+        known = (labels >= 0) & (labels < len(label_to_student))
+        student_ids[known] = label_to_student[labels[known]]
+
+    results['student_id'] = student_ids
+    results['distance'] = distances
+    results['accepted'] = (student_ids >= 0) & (distances < threshold)
+    return results
+
+
+class CascadeLBPHRecognizer:
+    """Two-stage recognizer over a BinaryLBPHModel for large rosters
+
+    Stage one pools the LBPH cell histograms into a coarse grid (8x8 -> 4x4, 4x
+    fewer dimensions), ranks identities by their closest coarse descriptor and keeps
+    the top_k. Stage two runs the full chi-square only against the training
+    histograms of those identities. A face whose student misses the shortlist is
+    matched to someone else, so only use it when measure_recall() is high enough.
+    predict()/predict_batch() match BinaryLBPHModel.
+    """
+    
+    def __init__(self, model, top_k=20, coarse_grid=(4, 4)):
+        self.model = model
+        self.top_k = top_k
+        grid_x, grid_y = model.grid_x, model.grid_y
+        if grid_x % coarse_grid[0] or grid_y % coarse_grid[1]:
+            coarse_grid = (1, 1)
+        self.coarse_grid = coarse_grid
+        self.patterns = 2 ** model.neighbors
+        
+        # Coarse descriptors of the whole gallery, kept in memory
+        count = len(model)
+        self.coarse = np.empty((count, coarse_grid[0] * coarse_grid[1] * self.patterns), np.float32)
+        for start in range(0, count, lbph_model.PREDICT_CHUNK_ROWS):
+            chunk = np.asarray(model.histograms[start:start + lbph_model.PREDICT_CHUNK_ROWS], dtype=np.float32)
+            self.coarse[start:start + len(chunk)] = self._pool(chunk / np.float32(model.scale))
+        self.coarse_sums = self.coarse.sum(axis=1, dtype=np.float64)
+        
+        # Gallery rows grouped by identity, for per-identity minimum and shortlist lookups
+        labels = np.asarray(model.labels, dtype=np.int64)
+        self.identities, self.identity_index = np.unique(labels, return_inverse=True)
+        self.rows_by_identity = np.argsort(self.identity_index, kind='stable')
+        self.identity_starts = np.searchsorted(self.identity_index[self.rows_by_identity], np.arange(len(self.identities)))
+        self.identity_ends = np.append(self.identity_starts[1:], count)
+    
+    def _pool(self, histograms):
+        """Average grid cells of (n, cells*patterns) histograms into the coarse grid"""
+        cx, cy = self.coarse_grid
+        n = histograms.shape[0]
+        cells = histograms.reshape(n, cy, self.model.grid_y // cy, cx, self.model.grid_x // cx, self.patterns)
+        return cells.mean(axis=(2, 4)).reshape(n, -1)
+    
+    def __len__(self):
+        return len(self.model)
+    
+    def __getattr__(self, attr):
+        # label_mapping, metadata, threshold, getLabels(), ... come from the wrapped model
+        return getattr(self.model, attr)
+    
+    def _top_identities(self, query, exclude_row=None):
+        """Indices into identities of the top_k identities closest to a full query histogram"""
+        coarse_query = self._pool(np.asarray(query, dtype=np.float32).reshape(1, -1)).ravel()
+        distances = lbph_model.chi_square_distances(self.coarse, coarse_query, self.coarse_sums)
+        if exclude_row is not None:
+            distances[exclude_row] = np.inf
+        
+        best_per_identity = np.minimum.reduceat(distances[self.rows_by_identity], self.identity_starts)
+        k = min(self.top_k, len(self.identities))
+        return np.argpartition(best_per_identity, k - 1)[:k]
+    
+    def shortlist(self, query):
+        """Get the gallery rows of the top_k identities closest to a full query histogram"""
+        return np.concatenate([self.rows_by_identity[self.identity_starts[i]:self.identity_ends[i]]
+                               for i in self._top_identities(query)])
+    
+    def _predict_histogram(self, query):
+        rows = self.shortlist(query)
+        distances = self.model.distances(query, rows)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance >= self.model.threshold:
+            return -1, distance
+        return int(self.model.labels[rows[best]]), distance
+    
+    def measure_recall(self, samples=50, seed=0):
+        """Fraction of sampled gallery rows whose full-scan nearest identity makes the shortlist
+        
+        Each sampled row is left out of both scans (leave-one-out), so it stands in for
+        a new face of that student.
+        """
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(len(self), size=min(samples, len(self)), replace=False)
+        hits = 0
+        for row in queries:
+            query = np.asarray(self.model.histograms[row], dtype=np.float32) / np.float32(self.model.scale)
+            distances = self.model.distances(query)
+            distances[row] = np.inf
+            nearest = self.identity_index[int(np.argmin(distances))]
+            hits += nearest in self._top_identities(query, exclude_row=row)
+        return hits / len(queries) if len(queries) else 1.0
+    
+    def predict(self, src):
+        """Get (label, distance) of the closest stored face, like LBPHFaceRecognizer.predict"""
+        if len(self) == 0:
+            raise ValueError("Model contains no histograms")
+        return self._predict_histogram(self.model.compute_histogram(src))
+    
+    def predict_batch(self, faces, prepare=None):
+        """Get (labels, distances) arrays for a list of face images (prepare normalizes each first)"""
+        labels = np.full(len(faces), -1, np.int64)
+        distances = np.full(len(faces), np.inf)
+        if len(self) == 0:
+            return labels, distances
+        for i, face in enumerate(faces):
+            labels[i], distances[i] = self._predict_histogram(
+                self.model.compute_histogram(prepare(face) if prepare else face)
+            )
+        return labels, distances
+
+
+class ActiveModel:
+    """One loaded model version together with its label mapping and preprocessing settings
+
+    The engine replaces the whole instance in a single assignment, so a frame never
+    pairs the recognizer of one version with the labels of another.
+    """
+    
+    def __init__(self, recognizer, label_mapping, version=0, preprocess_faces=False, align_eyes=False):
+        self.recognizer = recognizer
+        self.label_mapping = label_mapping
+        self.label_to_student = label_array(label_mapping)
+        self.version = version
+        self.preprocess_faces = preprocess_faces
+        self.align_eyes = align_eyes
+
+
 class FaceRecognitionEngine:
     """Face recognition engine using LBPH method - same as original project"""
     
     def __init__(self):
         self.db = Database()
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
+        self.model = ActiveModel(cv2.face.LBPHFaceRecognizer_create(), {})
         self.training_data_path = "TrainingImage"
         self.model_path = "TrainingImageLabel" + os.sep + "Trainner.yml"
+        self.binary_model_path = "TrainingImageLabel" + os.sep + "Trainner.lbph"
         self.label_mapping_path = "TrainingImageLabel" + os.sep + "label_mapping.json"
         self.confidence_threshold = 40  # LBPH: lower is better (0-40 is good match)
-        self.label_mapping = {}  # Maps label index to student database ID
+        
+        # Skip blurred, tiny, profile or badly lit crops; capture is stricter so the gallery stays clean
+        self.quality_gate = FaceQualityGate()
+        self.capture_quality_gate = FaceQualityGate(min_size=80, min_sharpness=60.0)
+        
+        # Training keeps at most this many k-medoid prototype images per student (None keeps all)
+        self.prototypes_per_student = gallery_condense.PROTOTYPES_PER_STUDENT
+        
+        # Published models store histograms as uint8 (lossless for fixed-size faces, 4x smaller than float32)
+        self.model_dtype = 'uint8'
+        
+        # Large galleries are matched coarse-to-fine against a shortlist of identities, but only
+        # if the shortlist keeps the full-scan match for cascade_min_recall of sampled faces
+        self.cascade_min_histograms = 2000
+        self.cascade_min_recall = 0.98
+        self.shortlist_size = 20
+        
+        # Eye alignment for training; recognition follows what the loaded model was trained with
+        self.align_eyes = False
+        
+        # Dual-resolution detection: detect on a copy at most detection_width wide,
+        # recognize on full-resolution crops. Without a seating range faces of at
+        # least min_face_fraction of the frame width are searched, with no upper bound.
+        self.detection_width = 640
+        self.min_face_fraction = 0.1
+        self.camera_hfov_degrees = 70.0   # horizontal field of view of the classroom camera
+        self.seat_distance_m = None       # (nearest, farthest) seat in metres, e.g. (1.0, 6.0)
+        self.face_width_m = 0.16
+        self.cascade_window = 24          # smallest face the cascade detectors can find
+        self._detection_plans = {}        # frame (width, height) -> (scale, minSize, maxSize)
+        
+        # Lecture halls: capture at high resolution and find small faces in overlapping
+        # full-resolution tiles on a thread pool; faces larger than the tile overlap are
+        # left to the downscaled whole-frame pass
+        self.capture_size = (640, 480)
+        self.tile_detection = False
+        self.tile_size = 640              # tile edge in full-resolution pixels
+        self.tile_overlap = 160           # largest face the tiles look for (full-resolution pixels)
         
         # Create directories if they don't exist
         os.makedirs(self.training_data_path, exist_ok=True)
         os.makedirs("TrainingImageLabel", exist_ok=True)
         
-        # Load trained model if exists
-        if os.path.exists(self.model_path):
+        # Load trained model if exists: the current registry version, then the older
+        # Trainner.lbph, unless the YAML model was retrained more recently (e.g. by Train_Image.py)
+        binary_loaded = False
+        current = model_registry.current()
+        binary_path = current['path'] if current else self.binary_model_path
+        if os.path.exists(binary_path) and (
+                not os.path.exists(self.model_path)
+                or os.path.getmtime(binary_path) >= os.path.getmtime(self.model_path)):
+            try:
+                model = lbph_model.load_model(binary_path)
+                self.use_binary_model(model, current['version'] if current else 0)
+                binary_loaded = True
+                print(f"[v0] Binary model loaded successfully ({len(model)} histograms)")
+            except Exception as e:
+                print(f"[v0] Error loading binary model: {e}")
+        
+        if not binary_loaded and os.path.exists(self.model_path):
             try:
                 self.recognizer.read(self.model_path)
+                # Query crops must be prepared like the faces this YAML was trained on
+                settings = face_preprocess.load_settings(self.model_path)
+                self.model = ActiveModel(self.recognizer, {}, 0, settings['preprocessed'], settings['align_eyes'])
+                self.align_eyes = settings['align_eyes']
                 print("[v0] Model loaded successfully")
             except Exception as e:
                 print(f"[v0] Error loading model: {e}")
         
         # Load label mapping if exists
-        if os.path.exists(self.label_mapping_path):
+        if not self.label_mapping and os.path.exists(self.label_mapping_path):
             try:
                 with open(self.label_mapping_path, 'r') as f:
-                    self.label_mapping = json.load(f)
+                    self.set_label_mapping(json.load(f))
                 print(f"[v0] Label mapping loaded: {self.label_mapping}")
             except Exception as e:
                 print(f"[v0] Error loading label mapping: {e}")
     
-    def get_images_and_labels(self, path):
-        """Get images and labels from training directory"""
+    def face_size_range(self, frame_width):
+        """Expected (min, max) face width in pixels for a frame width, from the seat distances"""
+        pixels_per_m_at_1m = frame_width / (2.0 * np.tan(np.radians(self.camera_hfov_degrees) / 2.0))
+        nearest, farthest = self.seat_distance_m
+        return (pixels_per_m_at_1m * self.face_width_m / farthest,
+                pixels_per_m_at_1m * self.face_width_m / nearest)
+    
+    def _detection_plan(self, width, height):
+        """Get (scale, minSize, maxSize) for detecting faces in frames of this size
+        
+        The scale always brings the frame down to detection_width. maxSize is only
+        set when seat_distance_m is configured, so close faces are never dropped by default.
+        """
+        plan = self._detection_plans.get((width, height))
+        if plan is None:
+            scale = min(1.0, self.detection_width / width)
+            if self.seat_distance_m is None:
+                min_size = max(self.cascade_window, int(width * self.min_face_fraction * scale))
+                plan = (scale, (min_size, min_size), None)
+            else:
+                min_face, max_face = self.face_size_range(width)
+                if min_face * scale < self.cascade_window:
+                    print(f"[v0] Farthest faces are {min_face * scale:.0f}px at detection_width {self.detection_width}, "
+                          f"below the {self.cascade_window}px detector window; detecting them needs frames and a "
+                          f"detection_width of {int(np.ceil(width * self.cascade_window / min_face))}px")
+                min_size = max(self.cascade_window, int(min_face * scale))
+                max_size = max(min_size + 1, int(np.ceil(max_face * scale * 1.25)))
+                plan = (scale, (min_size, min_size), (max_size, max_size))
+            self._detection_plans[(width, height)] = plan
+        return plan
+    
+    def _tile_plan(self, width, height):
+        """Get (minSize, maxSize) of the full-resolution tile pass, from the seating range if configured"""
+        min_size = self.cascade_window
+        if self.seat_distance_m is not None:
+            min_size = max(min_size, int(self.face_size_range(width)[0]))
+        max_size = max(min_size + 1, self.tile_overlap)
+        return (min_size, min_size), (max_size, max_size)
+    
+    def detect_faces(self, gray, regions=None):
+        """Detect faces on a downscaled copy of gray and return boxes in full-resolution coordinates
+        
+        regions are the room's seat regions (fractions of the frame, see room_roi.py);
+        only those crops are scanned. None scans the whole frame.
+        
+        With tile_detection on and a frame wider than detection_width, faces up to
+        tile_overlap pixels are searched at full resolution tile by tile, and the
+        downscaled pass only looks for faces larger than that.
+        """
+        height, width = gray.shape[:2]
+        scale, min_size, max_size = self._detection_plan(width, height)
+        tiled = self.tile_detection and scale < 1.0
+        if tiled:
+            tile_min_size, tile_max_size = self._tile_plan(width, height)
+            coarse_min = max(self.cascade_window, int(tile_max_size[0] * 0.8 * scale))  # overlaps the tile range
+            min_size = (coarse_min, coarse_min)
+            if max_size is not None and max_size[0] <= coarse_min:
+                max_size = (coarse_min + 1, coarse_min + 1)
+        rects = to_pixel_rects(regions, width, height) if regions else [(0, 0, width, height)]
+        
+        found = []
+        for x, y, w, h in rects:
+            crop = gray[y:y+h, x:x+w]
+            if tiled:
+                faces = detect_tiled(crop, self.tile_size, tile_min_size, tile_max_size)
+                if len(faces):
+                    found.append(faces + np.array([x, y, 0, 0], np.int32))
+            if scale < 1.0:
+                crop = cv2.resize(crop, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+            faces = get_detector().detect(crop, min_size, max_size)
+            if len(faces) == 0:
+                continue
+            
+            boxes = np.round(faces.astype(np.float32) / scale).astype(np.int32) if scale < 1.0 else faces
+            boxes[:, 0] += x
+            boxes[:, 1] += y
+            found.append(boxes)
+        
+        if not found:
+            return np.zeros((0, 4), np.int32)
+        boxes = np.concatenate(found)
+        if len(rects) > 1 or tiled:
+            boxes = non_max_suppression(boxes)  # regions may overlap, and both passes may find a face
+        boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+        boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+        return boxes
+    
+    # Read-only views of the active model; replace self.model to change them
+    @property
+    def recognizer(self):
+        return self.model.recognizer
+    
+    @property
+    def label_mapping(self):
+        return self.model.label_mapping
+    
+    @property
+    def label_to_student(self):
+        return self.model.label_to_student
+    
+    @property
+    def preprocess_faces(self):
+        return self.model.preprocess_faces
+    
+    def use_binary_model(self, model, version=0):
+        """Recognize with a loaded BinaryLBPHModel, through the cascade recognizer for large galleries
+        
+        The cascade is only used when the shortlist recall measured at training time
+        (metadata 'shortlist', see _measure_shortlist) reaches cascade_min_recall.
+        """
+        recognizer = model
+        shortlist = model.metadata.get('shortlist')
+        if len(model) >= self.cascade_min_histograms and shortlist:
+            if shortlist['recall'] >= self.cascade_min_recall:
+                recognizer = CascadeLBPHRecognizer(model, shortlist['top_k'], tuple(shortlist['coarse_grid']))
+                print(f"[v0] Using coarse-to-fine recognizer (top {shortlist['top_k']} of "
+                      f"{len(recognizer.identities)} identities, shortlist recall {shortlist['recall']:.0%})")
+            else:
+                print(f"[v0] Shortlist recall {shortlist['recall']:.0%} is below {self.cascade_min_recall:.0%}, "
+                      f"scanning the full gallery")
+        align_eyes = bool(model.metadata.get('align_eyes'))
+        self.model = ActiveModel(recognizer, model.label_mapping, version,
+                                 bool(model.metadata.get('preprocessed')), align_eyes)
+        self.align_eyes = align_eyes
+    
+    def _measure_shortlist(self, recognizer):
+        """Shortlist settings and recall of a trained recognizer for the model metadata
+        
+        Runs once per training (a few dozen full-gallery scans) so loading the model
+        stays fast. Returns None for galleries too small to use the cascade.
+        """
+        if len(recognizer.getLabels()) < self.cascade_min_histograms:
+            return None
+        path = os.path.join(os.path.dirname(self.binary_model_path), "shortlist_check.tmp.lbph")
+        lbph_model.save_recognizer(recognizer, path, dtype=self.model_dtype)
+        cascade = CascadeLBPHRecognizer(lbph_model.load_model(path), self.shortlist_size)
+        shortlist = {'top_k': cascade.top_k, 'coarse_grid': list(cascade.coarse_grid),
+                     'recall': cascade.measure_recall()}
+        del cascade
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # still mapped (Windows); overwritten by the next training
+        print(f"[v0] Shortlist recall {shortlist['recall']:.0%} (top {shortlist['top_k']}, "
+              f"{shortlist['coarse_grid'][0]}x{shortlist['coarse_grid'][1]} grid)")
+        return shortlist
+    
+    def set_label_mapping(self, label_mapping):
+        """Set the label -> student database ID mapping (JSON form, string keys) of the active model"""
+        model = self.model
+        self.model = ActiveModel(model.recognizer, label_mapping, model.version,
+                                 model.preprocess_faces, model.align_eyes)
+    
+    def watch_model_updates(self, interval=2.0):
+        """Swap in newly published model versions while recognition keeps running (idempotent)"""
+        if not getattr(self, '_watching_models', False):
+            self._watching_models = True
+            model_registry.watch(self._on_model_published, interval)
+    
+    def _on_model_published(self, version, model):
+        """Registry watcher callback: build the new recognizer off-thread, then swap it in"""
+        if version <= self.model.version:
+            return
+        self.use_binary_model(model, version)
+        print(f"[v0] Switched to model version {version} ({len(model)} histograms, {len(model.label_mapping)} students)")
+    
+    def recognize_batch(self, frame_gray, boxes):
+        """Recognize every (x, y, w, h) box of a grayscale frame in one call
+        
+        Returns a RECOGNITION_DTYPE array with one (student_id, distance, accepted)
+        row per box; student_id is -1 when the predicted label is unmapped.
+        """
+        model = self.model  # one version for the whole frame, even if a new one is swapped in meanwhile
+        prepare = get_preprocessor(model.align_eyes).process if model.preprocess_faces else None
+        return recognize_faces_batch(model.recognizer, frame_gray, boxes, model.label_to_student,
+                                     self.confidence_threshold, prepare)
+    
+    def prepare_face(self, face, model=None):
+        """Normalize a grayscale face crop the way the loaded model expects (shared buffer, copy to keep it)"""
+        model = model or self.model
+        if not model.preprocess_faces:
+            return face
+        return get_preprocessor(model.align_eyes).process(face)
+    
+    def predict_face(self, face):
+        """Get (label, distance) for a grayscale face crop"""
+        model = self.model
+        return model.recognizer.predict(self.prepare_face(face, model))
+    
+    def get_images_and_labels(self, path, progress=None):
+        """Get images and labels from training directory
+        
+        progress, if given, is called as progress(stage, images_done, images_total, identities).
+        """
         faces = []
         Ids = []
         label_to_student = {}  # Maps label index to student database ID
@@ -54,7 +486,17 @@ class FaceRecognitionEngine:
             print(f"[v0] Training path does not exist: {path}")
             return faces, Ids, label_to_student
         
-        for student_dir in sorted(os.listdir(path)):
+        student_dirs = sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d)))
+        total_images = 0
+        if progress:
+            total_images = sum(
+                1 for d in student_dirs for f in os.listdir(os.path.join(path, d))
+                if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+            )
+            progress('loading', 0, total_images, 0)
+        images_seen = 0
+        
+        for student_dir in student_dirs:
             student_path = os.path.join(path, student_dir)
             if not os.path.isdir(student_path):
                 continue
@@ -86,6 +528,10 @@ class FaceRecognitionEngine:
                     if not image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
                         continue
                     
+                    images_seen += 1
+                    if progress and images_seen % 25 == 0:
+                        progress('loading', images_seen, total_images, len(label_to_student))
+                    
                     image_path = os.path.join(student_path, image_file)
                     try:
                         pilImage = cv2.imread(image_path)
@@ -94,7 +540,7 @@ class FaceRecognitionEngine:
                             continue
                         
                         gray = cv2.cvtColor(pilImage, cv2.COLOR_BGR2GRAY)
-                        faces.append(gray)
+                        faces.append(get_preprocessor(self.align_eyes).process(gray).copy())
                         Ids.append(current_label)
                         image_count += 1
                     except Exception as e:
@@ -108,6 +554,8 @@ class FaceRecognitionEngine:
                 print(f"[v0] Error processing directory {student_dir}: {str(e)}")
                 continue
         
+        if progress:
+            progress('loading', images_seen, total_images, len(label_to_student))
         print(f"[v0] Total faces loaded: {len(faces)}, Label mapping: {label_to_student}")
         return faces, Ids, label_to_student
     
@@ -123,6 +571,10 @@ class FaceRecognitionEngine:
             cap.set(4, 480)  # set video height
             
             count = 0
+            # Consecutive frames of a still face are near-identical; keep only new poses
+            deduplicator = FaceDeduplicator()
+            # JPEG encoding and disk writes happen on writer threads, off the camera loop
+            writer = AsyncImageWriter()
             
             student_dir = os.path.join(self.training_data_path, f"{student_name}.{student_id}")
             os.makedirs(student_dir, exist_ok=True)
@@ -136,15 +588,26 @@ class FaceRecognitionEngine:
                     break
                 
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.2, 5)
+                faces = get_detector().detect(gray)
                 
                 for (x, y, w, h) in faces:
-                    count += 1
+                    passed, reason = self.capture_quality_gate.check(gray[y:y+h, x:x+w])
+                    if not passed:
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                        cv2.putText(frame, reason, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+                        continue
+                    
+                    if not deduplicator.add(gray[y:y+h, x:x+w]):
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 255), 2)
+                        cv2.putText(frame, "Move your head slightly", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+                        continue
                     
                     # Save the captured face with naming convention: Name.StudentID.ImageNumber.jpg
-                    face_roi = frame[y:y+h, x:x+w]
-                    image_path = os.path.join(student_dir, f"{student_name}.{student_id}.{count}.jpg")
-                    cv2.imwrite(image_path, face_roi)
+                    # (copied, since the rectangle below is drawn on the same frame)
+                    image_path = os.path.join(student_dir, f"{student_name}.{student_id}.{count + 1}.jpg")
+                    if not writer.write(image_path, frame[y:y+h, x:x+w].copy()):
+                        continue
+                    count += 1
                     
                     # Draw rectangle on frame
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
@@ -158,6 +621,12 @@ class FaceRecognitionEngine:
             
             cap.release()
             cv2.destroyAllWindows()
+            writer.close()
+            
+            print(f"[v0] Capture quality: {self.capture_quality_gate.summary()}")
+            print(f"[v0] Skipped {deduplicator.skipped} near-duplicate crops")
+            print(f"[v0] Image writer: {writer.summary()}")
+            count = writer.written
             
             if count >= num_images:
                 return True, f"Successfully captured {count} images for {student_name}"
@@ -167,27 +636,78 @@ class FaceRecognitionEngine:
         except Exception as e:
             return False, f"Error capturing faces: {str(e)}"
     
-    def train_model(self):
-        """Train the LBPH face recognition model"""
+    def train_model(self, progress=None):
+        """Train the LBPH face recognition model
+        
+        Runs synchronously; GUIs should use training_jobs.training_runner, which trains in
+        a subprocess. progress is passed on to get_images_and_labels() and is also
+        called for the 'training' and 'saving' stages.
+        """
         try:
-            faces, Ids, label_to_student = self.get_images_and_labels(self.training_data_path)
+            faces, Ids, label_to_student = self.get_images_and_labels(self.training_data_path, progress)
             
             if len(faces) == 0:
                 return False, "No training images found. Please capture student faces first."
             
             print(f"[v0] Training model with {len(faces)} images...")
             
-            self.label_mapping = {str(k): v for k, v in label_to_student.items()}
-            with open(self.label_mapping_path, "w") as f:
-                json.dump(self.label_mapping, f, indent=2)
+            label_mapping = {str(k): v for k, v in label_to_student.items()}
+            
+            if progress:
+                progress('training', len(faces), len(faces), len(label_to_student))
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.train(faces, np.array(Ids))
+            
+            # Replace each student's images by k-medoid prototypes, cutting the predict scan
+            condensed = ""
+            metadata = {'preprocessed': True, 'face_size': list(FACE_SIZE), 'align_eyes': self.align_eyes}
+            if self.prototypes_per_student:
+                if progress:
+                    progress('condensing', len(faces), len(faces), len(label_to_student))
+                histograms = np.vstack(recognizer.getHistograms())
+                keep = gallery_condense.condense(histograms, Ids, self.prototypes_per_student)
+                if len(keep) < len(faces):
+                    full_accuracy, condensed_accuracy, samples = gallery_condense.evaluate(
+                        histograms, Ids, self.prototypes_per_student)
+                    recognizer = cv2.face.LBPHFaceRecognizer_create()
+                    recognizer.train([faces[i] for i in keep], np.array(Ids)[keep])
+                    metadata['condensation'] = {
+                        'prototypes_per_student': self.prototypes_per_student,
+                        'images': len(faces),
+                        'prototypes': len(keep),
+                        'heldout_accuracy_full': full_accuracy,
+                        'heldout_accuracy_condensed': condensed_accuracy,
+                        'samples': samples,
+                    }
+                    accuracy = f"held-out accuracy {full_accuracy:.1%} -> {condensed_accuracy:.1%} on {samples} samples"
+                    condensed = f", condensed to {len(keep)} prototypes ({accuracy})"
+                    print(f"[v0] Gallery condensed from {len(faces)} to {len(keep)} histograms ({accuracy})")
+            
+            shortlist = self._measure_shortlist(recognizer)
+            if shortlist:
+                metadata['shortlist'] = shortlist
             
-            print(f"[v0] Label mapping saved: {self.label_mapping}")
+            if progress:
+                progress('saving', len(faces), len(faces), len(label_to_student))
+            # YAML model and mapping file for Recognize.py and older tools, each written to a
+            # temporary file and renamed, so a cancelled or crashed run never leaves half a file
+            root, extension = os.path.splitext(self.model_path)
+            tmp_model_path = root + ".tmp" + extension  # cv2 picks the format from the extension
+            recognizer.save(tmp_model_path)
+            os.replace(tmp_model_path, self.model_path)
+            face_preprocess.save_settings(self.model_path, True, self.align_eyes)
+            tmp_mapping_path = self.label_mapping_path + ".tmp"
+            with open(tmp_mapping_path, "w") as f:
+                json.dump(label_mapping, f, indent=2)
+            os.replace(tmp_mapping_path, self.label_mapping_path)
+            print(f"[v0] Label mapping saved: {label_mapping}")
             
-            self.recognizer.train(faces, np.array(Ids))
-            self.recognizer.save(self.model_path)
+            # The registry version carries model and mapping together; running sessions pick it up
+            version = model_registry.publish(recognizer, label_mapping, metadata, self.model_dtype)
+            self.use_binary_model(lbph_model.load_model(model_registry.current()['path']), version)
             
-            print(f"[v0] Model trained successfully and saved to {self.model_path}")
-            return True, f"Model trained successfully with {len(faces)} images from {len(label_to_student)} students"
+            print(f"[v0] Model trained successfully and saved as version {version} and to {self.model_path}")
+            return True, f"Model trained successfully with {len(faces)} images from {len(label_to_student)} students{condensed}"
         
         except Exception as e:
             print(f"[v0] Error training model: {str(e)}")
@@ -196,33 +716,34 @@ class FaceRecognitionEngine:
     def recognize_faces_realtime(self, timetable_id, session_callback=None):
         """Recognize faces in real-time and mark attendance"""
         try:
-            if not os.path.exists(self.model_path):
+            if (not os.path.exists(self.model_path) and not os.path.exists(self.binary_model_path)
+                    and not model_registry.current()):
                 return False, "Model not trained. Please train the model first."
             
             if not self.label_mapping:
                 print("[v0] Loading label mapping...")
                 if os.path.exists(self.label_mapping_path):
                     with open(self.label_mapping_path, 'r') as f:
-                        self.label_mapping = json.load(f)
+                        self.set_label_mapping(json.load(f))
                 else:
                     return False, "Label mapping not found. Please train the model first."
             
             print(f"[v0] Label mapping available: {self.label_mapping}")
+            self.watch_model_updates()
             
             cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
             
             if not cap.isOpened():
                 return False, "Cannot access webcam"
             
-            cap.set(3, 640)  # set video width
-            cap.set(4, 480)  # set video height
-            
-            # Define min window size to be recognized as a face
-            minW = 0.1 * cap.get(3)
-            minH = 0.1 * cap.get(4)
+            cap.set(3, self.capture_size[0])  # set video width
+            cap.set(4, self.capture_size[1])  # set video height
             
             recognized_students = {}
             frame_count = 0
+            motion_gate = MotionGate()
+            annotations = []
+            regions = room_roi_config.get_regions_for_timetable(timetable_id)
             
             print("[v0] Starting face recognition...")
             
@@ -234,61 +755,17 @@ class FaceRecognitionEngine:
                 
                 frame_count += 1
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(
-                    gray, 1.2, 5, 
-                    minSize=(int(minW), int(minH)), 
-                    flags=cv2.CASCADE_SCALE_IMAGE
-                )
                 
-                for (x, y, w, h) in faces:
+                # Only detect when the scene changed, otherwise redraw the last results
+                if motion_gate.should_process(gray):
+                    annotations = self._recognize_frame(
+                        gray, frame_count, timetable_id, recognized_students, session_callback, regions
+                    )
+                
+                for (x, y, w, h), name_text, conf_text, conf_color in annotations:
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (10, 159, 255), 2)
-                    
-                    label, conf = self.recognizer.predict(gray[y:y+h, x:x+w])
-                    confstr = "  {0}%".format(round(100 - conf))
-                    
-                    print(f"[v0] Frame {frame_count}: Detected label={label}, conf={conf}, threshold={self.confidence_threshold}")
-                    
-                    if str(label) in self.label_mapping:
-                        student_id = int(self.label_mapping[str(label)])
-                        
-                        if conf < self.confidence_threshold:
-                            student = self.db.get_student_by_id(student_id)
-                            if student:
-                                student_name = student[2]
-                                
-                                # Mark attendance only once per session
-                                if student_id not in recognized_students:
-                                    ts = time.time()
-                                    timeStamp = datetime.fromtimestamp(ts).strftime('%H:%M:%S')
-                                    self.db.mark_attendance(student_id, timetable_id, conf)
-                                    recognized_students[student_id] = (student_name, timeStamp)
-                                    
-                                    print(f"[v0] Marked attendance for {student_name} (ID: {student_id})")
-                                    
-                                    if session_callback:
-                                        session_callback(f"Recognized: {student_name}", 100 - conf)
-                                
-                                tt = f"{student_id}-{student_name} [Pass]"
-                                cv2.putText(frame, str(tt), (x+5, y-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                                cv2.putText(frame, str(confstr), (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 1)
-                            else:
-                                print(f"[v0] Student ID {student_id} not found in database")
-                                tt = "Unknown"
-                                cv2.putText(frame, str(tt), (x+5, y-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                                cv2.putText(frame, str(confstr), (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 1)
-                        else:
-                            print(f"[v0] Confidence {conf} exceeds threshold {self.confidence_threshold}")
-                            tt = "Unknown"
-                            cv2.putText(frame, str(tt), (x+5, y-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                            if conf < 50:
-                                cv2.putText(frame, str(confstr), (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 1)
-                            else:
-                                cv2.putText(frame, str(confstr), (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 1)
-                    else:
-                        print(f"[v0] Label {label} not in mapping. Available labels: {list(self.label_mapping.keys())}")
-                        tt = "Unknown"
-                        cv2.putText(frame, str(tt), (x+5, y-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                        cv2.putText(frame, str(confstr), (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 1)
+                    cv2.putText(frame, name_text, (x+5, y-5), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                    cv2.putText(frame, conf_text, (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 1, conf_color, 1)
                 
                 cv2.imshow('Attendance', frame)
                 
@@ -298,12 +775,78 @@ class FaceRecognitionEngine:
             cap.release()
             cv2.destroyAllWindows()
             
+            print(f"[v0] Motion gate skipped {motion_gate.frames_skipped} of {motion_gate.frames_seen} frames")
+            print(f"[v0] Face quality: {self.quality_gate.summary()}")
             return True, f"Recognition complete. Marked {len(recognized_students)} students"
         
         except Exception as e:
             print(f"[v0] Error during recognition: {str(e)}")
             return False, f"Error during recognition: {str(e)}"
     
+    def _recognize_frame(self, gray, frame_count, timetable_id, recognized_students, session_callback=None, regions=None):
+        """Detect and recognize faces in one frame, mark attendance and return the annotations to draw"""
+        annotations = []
+        boxes = []
+        
+        for (x, y, w, h) in self.detect_faces(gray, regions):
+            passed, reason = self.quality_gate.check(gray[y:y+h, x:x+w])
+            if passed:
+                boxes.append((x, y, w, h))
+            else:
+                annotations.append(((x, y, w, h), "Low quality", f"  {reason}", (0, 0, 255)))
+        
+        results = self.recognize_batch(gray, boxes)
+        
+        for (x, y, w, h), (student_id, conf, accepted) in zip(boxes, results.tolist()):
+            confstr = "  {0}%".format(round(100 - conf))
+            
+            print(f"[v0] Frame {frame_count}: Detected student={student_id}, conf={conf}, threshold={self.confidence_threshold}")
+            
+            tt = "Unknown"
+            conf_color = (0, 0, 255)
+            if accepted:
+                student = self.db.get_student_by_id(student_id)
+                if student:
+                    student_name = student[2]
+                    
+                    # Mark attendance only once per session
+                    if student_id not in recognized_students:
+                        ts = time.time()
+                        timeStamp = datetime.fromtimestamp(ts).strftime('%H:%M:%S')
+                        self.db.mark_attendance(student_id, timetable_id, conf)
+                        recognized_students[student_id] = (student_name, timeStamp)
+                        
+                        print(f"[v0] Marked attendance for {student_name} (ID: {student_id})")
+                        
+                        if session_callback:
+                            session_callback(f"Recognized: {student_name}", 100 - conf)
+                    
+                    tt = f"{student_id}-{student_name} [Pass]"
+                    conf_color = (0, 255, 0)
+                else:
+                    print(f"[v0] Student ID {student_id} not found in database")
+            elif student_id >= 0:
+                print(f"[v0] Confidence {conf} exceeds threshold {self.confidence_threshold}")
+                if conf < 50:
+                    conf_color = (0, 255, 255)
+            else:
+                print("[v0] Predicted label is not in the label mapping")
+            
+            annotations.append(((x, y, w, h), tt, confstr, conf_color))
+        
+        return annotations
+    
+    def reload_model(self):
+        """Switch to the registry's current model if it is newer than the active one"""
+        try:
+            if model_registry.current_version() <= self.model.version:
+                return True, f"Model version {self.model.version} is current"
+            version, model = model_registry.load_current()
+            self._on_model_published(version, model)
+            return True, f"Loaded model version {version}"
+        except Exception as e:
+            return False, f"Error reloading model: {str(e)}"
+    
     def check_camera(self):
         """Check if camera is working"""
         try:
@@ -323,5 +866,5 @@ class FaceRecognitionEngine:
         except Exception as e:
             return False, f"Error checking camera: {str(e)}"
 
-# Initialize face recognition engine
-face_recognition_engine = FaceRecognitionEngine()
+# Face recognition engine, created on first use
+face_recognition_engine = register_service('face_recognition_engine', FaceRecognitionEngine)
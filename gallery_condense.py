@@ -0,0 +1,118 @@
+import numpy as np
+from lbph_model import chi_square_distances
+
+# Prototypes kept per student after training (LBPH otherwise keeps one histogram per image)
+PROTOTYPES_PER_STUDENT = 5
+
+
+def distance_matrix(histograms):
+    """Pairwise chi-square distances of a set of histograms"""
+    sums = histograms.sum(axis=1, dtype=np.float64)
+    matrix = np.empty((len(histograms), len(histograms)))
+    for i in range(len(histograms)):
+        matrix[i] = chi_square_distances(histograms, histograms[i], sums)
+    # CHISQR_ALT is symmetric; average away float rounding
+    return (matrix + matrix.T) / 2.0
+
+
+def k_medoids(distances, k, max_iter=20):
+    """Indices of k medoids for a precomputed distance matrix (alternating k-medoids)
+
+    Starts from the most central point and then the farthest-first points, so the
+    result is deterministic and covers outlying poses before refining.
+    """
+    n = len(distances)
+    if n <= k:
+        return np.arange(n)
+
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < k:
+        candidate = int(np.argmax(nearest))
+        medoids.append(candidate)
+        np.minimum(nearest, distances[candidate], out=nearest)
+    medoids = np.array(medoids)
+
+    for _ in range(max_iter):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members):
+                within = distances[np.ix_(members, members)].sum(axis=1)
+                updated[cluster] = members[np.argmin(within)]
+        if np.array_equal(np.sort(updated), np.sort(medoids)):
+            break
+        medoids = updated
+    return np.sort(medoids)
+
+
+def condense(histograms, labels, prototypes_per_identity=PROTOTYPES_PER_STUDENT):
+    """Rows to keep so each label is represented by at most prototypes_per_identity medoids"""
+    histograms = np.asarray(histograms, dtype=np.float32)
+    labels = np.asarray(labels).ravel()
+    keep = []
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        if len(rows) <= prototypes_per_identity:
+            keep.append(rows)
+        else:
+            keep.append(rows[k_medoids(distance_matrix(histograms[rows]), prototypes_per_identity)])
+    return np.sort(np.concatenate(keep)) if keep else np.zeros(0, np.int64)
+
+
+def evaluate(histograms, labels, prototypes_per_identity=PROTOTYPES_PER_STUDENT, samples=100, seed=0):
+    """Held-out nearest-neighbour accuracy of the full and the condensed gallery
+
+    A sample of histograms (from students with more than one) is held out, the rest
+    is condensed, and each held-out histogram is matched against the remaining rows
+    (full) and against their prototypes (condensed). The queries never take part in
+    choosing the medoids. Returns (full, condensed, samples).
+    """
+    histograms = np.asarray(histograms, dtype=np.float32)
+    labels = np.asarray(labels).ravel()
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    candidates = np.flatnonzero(counts[inverse] > 1)
+    if len(candidates) == 0:
+        return 0.0, 0.0, 0
+
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(candidates, size=min(samples, len(candidates)), replace=False)
+    gallery = np.setdiff1d(np.arange(len(labels)), queries)
+    kept = gallery[condense(histograms[gallery], labels[gallery], prototypes_per_identity)]
+    gallery_sums = histograms[gallery].sum(axis=1, dtype=np.float64)
+    kept_sums = histograms[kept].sum(axis=1, dtype=np.float64)
+
+    full_correct = condensed_correct = 0
+    for q in queries:
+        nearest = gallery[np.argmin(chi_square_distances(histograms[gallery], histograms[q], gallery_sums))]
+        full_correct += labels[nearest] == labels[q]
+        nearest = kept[np.argmin(chi_square_distances(histograms[kept], histograms[q], kept_sums))]
+        condensed_correct += labels[nearest] == labels[q]
+    return full_correct / len(queries), condensed_correct / len(queries), len(queries)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from model_registry import model_registry
+
+    parser = argparse.ArgumentParser(description="Report the effect of condensing the current model's gallery")
+    parser.add_argument("--k", type=int, nargs='+', default=[3, PROTOTYPES_PER_STUDENT, 10],
+                        help="prototypes per student to try")
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    version, model = model_registry.load_current()
+    if model is None:
+        raise SystemExit("No model published yet")
+    histograms = np.asarray(model.histograms, dtype=np.float32) / np.float32(model.scale)
+    labels = np.asarray(model.labels)
+    print(f"Model version {version}: {len(labels)} histograms, {len(np.unique(labels))} students")
+    for k in args.k:
+        started = time.perf_counter()
+        keep = condense(histograms, labels, k)
+        seconds = time.perf_counter() - started
+        full, condensed, samples = evaluate(histograms, labels, k, args.samples)
+        print(f"k={k:3d}: {len(keep):6d} histograms ({len(labels) / max(len(keep), 1):.1f}x fewer), "
+              f"held-out accuracy {full:.1%} -> {condensed:.1%} on {samples} samples, condensed in {seconds:.1f}s")
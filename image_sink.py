@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+import cv2
+
+
+class AsyncImageWriter:
+    """Encodes and writes images on background threads so capture loops never block on disk
+
+    write() copies nothing and returns at once: the caller must pass an array it
+    will not modify afterwards (a crop .copy() or a new frame). When the queue is
+    full the image is dropped and counted rather than stalling the camera.
+    flush() waits until everything queued is on disk; close() also stops the threads.
+    """
+
+    def __init__(self, max_queue=64, workers=2, jpeg_quality=95):
+        self.jpeg_quality = jpeg_quality
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, path, image):
+        """Queue an image for writing; returns False if it was dropped because the queue is full"""
+        try:
+            self._queue.put_nowait((path, image))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, image = item
+                params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if path.lower().endswith(('.jpg', '.jpeg')) else []
+                ok = cv2.imwrite(path, image, params)
+                with self._lock:
+                    if ok:
+                        self.written += 1
+                    else:
+                        self.failed += 1
+                if not ok:
+                    print(f"[v0] Could not write image: {path}")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[v0] Error writing image: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    @property
+    def pending(self):
+        """Images queued but not yet written"""
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout=None):
+        """Wait until every queued image is written; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=None):
+        """Flush and stop the writer threads"""
+        flushed = self.flush(timeout)
+        for _ in self._threads:
+            self._queue.put(None)
+        return flushed
+
+    def summary(self):
+        """One-line summary of the writes so far"""
+        return f"Wrote {self.written} images, dropped {self.dropped}, failed {self.failed}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
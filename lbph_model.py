@@ -0,0 +1,387 @@
+import json
+import os
+import numpy as np
+
+# Binary LBPH model layout (all little-endian):
+#   MAGIC (8 bytes) | header length (uint32) | JSON header, padded to ALIGNMENT
+#   histograms (count x dims, float32, uint16 or uint8), padded to ALIGNMENT
+#   labels (count, int32)
+# The JSON header holds the LBPH parameters, dtype, offsets and the label mapping,
+# so one file replaces Trainner.yml + label_mapping.json and can be np.memmap'ed.
+MAGIC = b"LBPHBIN1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# Quantized dtypes: numpy type and the largest stored value
+QUANTIZED_DTYPES = {'uint16': ('<u2', 65535), 'uint8': ('<u1', 255)}
+PREDICT_CHUNK_ROWS = 512
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def quantization_scale(histograms, max_value):
+    """Scale that turns histogram fractions into integers of at most max_value
+
+    Bins are pixel counts divided by the cell size, so when every histogram comes from
+    same-size faces (face_preprocess) the cell size is exact and storage is lossless,
+    e.g. 144 pixels per cell for 100x100 faces fits uint8. Otherwise bins are rounded
+    to max_value levels. With an exact cell size uint16 stores the same values as uint8
+    at twice the size; it only adds precision for mixed-size faces.
+    """
+    nonzero = histograms[histograms > 0]
+    if nonzero.size:
+        cell_pixels = float(np.rint(1.0 / nonzero.min()))
+        if cell_pixels <= max_value and np.abs(histograms * cell_pixels - np.rint(histograms * cell_pixels)).max() < 1e-3:
+            return cell_pixels
+    return float(max_value)
+
+
+def chi_square_distances(gallery, query, gallery_sums=None):
+    """Chi-square (CHISQR_ALT) distance from one histogram to every row of a gallery
+
+    For non-negative bins (g - q)^2 / (g + q) = g + q - 4gq / (g + q), and the last
+    term is zero wherever the query bin is empty, so only the query's non-zero bins
+    are read from the gallery. query must be in the gallery's units; gallery_sums
+    (row sums) can be passed in when they are cached.
+    """
+    query = np.asarray(query, dtype=np.float32).ravel()
+    columns = np.flatnonzero(query)
+    values = query[columns]
+    if gallery_sums is None:
+        gallery_sums = gallery.sum(axis=1, dtype=np.float64)
+
+    chunk = np.take(gallery, columns, axis=1).astype(np.float32)
+    denominator = chunk + values
+    chunk *= values
+    np.divide(chunk, denominator, out=chunk)
+    shared = chunk.sum(axis=1, dtype=np.float64)
+    return np.maximum(2.0 * (gallery_sums + float(query.sum(dtype=np.float64)) - 4.0 * shared), 0.0)
+
+
+def elbp(src, radius=1, neighbors=8):
+    """Extended local binary pattern codes of a grayscale image, as OpenCV's LBPH computes them"""
+    src = np.asarray(src, dtype=np.float32)
+    h, w = src.shape[0] - 2 * radius, src.shape[1] - 2 * radius
+    if h <= 0 or w <= 0:
+        return np.zeros((0, 0), np.int32)
+
+    center = src[radius:radius + h, radius:radius + w]
+    codes = np.zeros((h, w), np.int32)
+    eps = np.finfo(np.float32).eps
+    one = np.float32(1)
+
+    def shifted(dy, dx):
+        return src[radius + dy:radius + dy + h, radius + dx:radius + dx + w]
+
+    for n in range(neighbors):
+        # Sample point and bilinear weights in float32, like the C++ implementation
+        x = np.float32(radius * np.cos(2.0 * np.pi * n / float(neighbors)))
+        y = np.float32(-radius * np.sin(2.0 * np.pi * n / float(neighbors)))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        tx, ty = np.float32(x - fx), np.float32(y - fy)
+        w1 = (one - tx) * (one - ty)
+        w2 = tx * (one - ty)
+        w3 = (one - tx) * ty
+        w4 = tx * ty
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        codes |= (((t > center) | (np.abs(t - center) < eps)).astype(np.int32) << n)
+    return codes
+
+
+def spatial_histogram(codes, num_patterns, grid_x, grid_y):
+    """Concatenated per-cell LBP histograms, each normalized by the cell size (1 x cells*patterns)"""
+    width = codes.shape[1] // grid_x
+    height = codes.shape[0] // grid_y
+    result = np.zeros((grid_x * grid_y, num_patterns), np.float32)
+    if width == 0 or height == 0:
+        return result.reshape(1, -1)
+
+    for i in range(grid_y):
+        for j in range(grid_x):
+            cell = codes[i * height:(i + 1) * height, j * width:(j + 1) * width]
+            counts = np.bincount(cell.ravel(), minlength=num_patterns)[:num_patterns]
+            result[i * grid_x + j] = counts / cell.size
+    return result.reshape(1, -1)
+
+
+def compute_histogram(gray, radius=1, neighbors=8, grid_x=8, grid_y=8):
+    """LBPH feature vector of a grayscale face image"""
+    codes = elbp(gray, radius, neighbors)
+    return spatial_histogram(codes, 2 ** neighbors, grid_x, grid_y)
+
+
+def save_model(path, histograms, labels, label_mapping=None, radius=1, neighbors=8,
+               grid_x=8, grid_y=8, dtype='float32', metadata=None):
+    """Write histograms, labels and label mapping into one binary model file (atomically)
+
+    metadata is a JSON-serializable dict stored in the header, e.g. how faces were preprocessed.
+    dtype 'uint8'/'uint16' stores quantized bins (see quantization_scale), 4x/2x smaller than float32;
+    for preprocessed faces both use the scale 144 and hold identical values, so prefer uint8.
+    """
+    if dtype != 'float32' and dtype not in QUANTIZED_DTYPES:
+        raise ValueError(f"Unsupported histogram dtype: {dtype}")
+
+    histograms = np.asarray(histograms, dtype=np.float32)
+    if histograms.ndim == 1:
+        histograms = histograms.reshape(1, -1)
+    labels = np.asarray(labels, dtype='<i4').ravel()
+    if histograms.shape[0] != labels.shape[0]:
+        raise ValueError(f"{histograms.shape[0]} histograms but {labels.shape[0]} labels")
+
+    if dtype in QUANTIZED_DTYPES:
+        numpy_dtype, max_value = QUANTIZED_DTYPES[dtype]
+        scale = quantization_scale(histograms, max_value)
+        data = np.clip(np.rint(histograms * scale), 0, max_value).astype(numpy_dtype)
+    else:
+        data = histograms.astype('<f4')
+        scale = 1.0
+
+    header = {
+        'version': FORMAT_VERSION,
+        'dtype': dtype,
+        'scale': scale,
+        'count': int(data.shape[0]),
+        'dims': int(data.shape[1]),
+        'radius': int(radius),
+        'neighbors': int(neighbors),
+        'grid_x': int(grid_x),
+        'grid_y': int(grid_y),
+        'label_mapping': {str(k): v for k, v in (label_mapping or {}).items()},
+        'metadata': metadata or {},
+    }
+
+    # Offsets depend on the header length, so size the header with placeholder offsets first
+    header['hist_offset'] = header['labels_offset'] = 0
+    header_len = len(json.dumps(header).encode('utf-8')) + 64
+    hist_offset = _align(len(MAGIC) + 4 + header_len)
+    labels_offset = _align(hist_offset + data.nbytes)
+    header['hist_offset'] = hist_offset
+    header['labels_offset'] = labels_offset
+    header_bytes = json.dumps(header).encode('utf-8').ljust(header_len, b' ')
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(header_len).astype('<u4').tobytes())
+        f.write(header_bytes)
+        f.write(b'\0' * (hist_offset - f.tell()))
+        f.write(data.tobytes())
+        f.write(b'\0' * (labels_offset - f.tell()))
+        f.write(labels.tobytes())
+    os.replace(tmp_path, path)
+
+
+def save_recognizer(recognizer, path, label_mapping=None, dtype='float32', metadata=None):
+    """Write a trained cv2 LBPHFaceRecognizer as a binary model file"""
+    histograms = recognizer.getHistograms()
+    histograms = np.vstack(histograms) if len(histograms) else np.zeros((0, 0), np.float32)
+    save_model(path, histograms, recognizer.getLabels(), label_mapping,
+               recognizer.getRadius(), recognizer.getNeighbors(),
+               recognizer.getGridX(), recognizer.getGridY(), dtype, metadata)
+
+
+class BinaryLBPHModel:
+    """LBPH model backed by a memory-mapped binary file
+
+    predict() follows cv2.face.LBPHFaceRecognizer.predict: it returns (label, distance)
+    of the nearest histogram by chi-square (CHISQR_ALT), or (-1, distance) above threshold.
+    The histogram pages are mapped read-only, so processes loading the same file share them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a binary LBPH model")
+            header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            header = json.loads(f.read(header_len).decode('utf-8'))
+
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model version {header.get('version')}")
+
+        self.header = header
+        self.radius = header['radius']
+        self.neighbors = header['neighbors']
+        self.grid_x = header['grid_x']
+        self.grid_y = header['grid_y']
+        self.scale = header['scale']
+        self.label_mapping = header.get('label_mapping', {})
+        self.metadata = header.get('metadata', {})
+        self.threshold = float('inf')
+        self._sums = None
+
+        count, dims = header['count'], header['dims']
+        self.quantized = header['dtype'] in QUANTIZED_DTYPES
+        dtype = QUANTIZED_DTYPES[header['dtype']][0] if self.quantized else '<f4'
+        if count:
+            self.histograms = np.memmap(path, dtype=dtype, mode='r', offset=header['hist_offset'], shape=(count, dims))
+            self.labels = np.memmap(path, dtype='<i4', mode='r', offset=header['labels_offset'], shape=(count,))
+        else:
+            self.histograms = np.zeros((0, dims), dtype)
+            self.labels = np.zeros(0, '<i4')
+        self._gallery = np.asarray(self.histograms)  # plain ndarray view, avoids memmap overhead per slice
+
+    def __len__(self):
+        return self.labels.shape[0]
+
+    def getLabels(self):
+        return np.asarray(self.labels).reshape(-1, 1)
+
+    def getThreshold(self):
+        return self.threshold
+
+    def setThreshold(self, threshold):
+        self.threshold = threshold
+
+    def compute_histogram(self, gray):
+        """LBPH feature vector of a face image with this model's parameters"""
+        return compute_histogram(gray, self.radius, self.neighbors, self.grid_x, self.grid_y)
+
+    def _row_sums(self):
+        """Sum of each stored histogram (in stored units), computed once"""
+        if self._sums is None:
+            sums = np.empty(len(self), np.float64)
+            for start in range(0, len(self), PREDICT_CHUNK_ROWS):
+                chunk = self.histograms[start:start + PREDICT_CHUNK_ROWS]
+                sums[start:start + len(chunk)] = chunk.sum(axis=1, dtype=np.float64)
+            self._sums = sums
+        return self._sums
+
+    def distances(self, query, rows=None):
+        """Chi-square distance from a query histogram to every stored histogram (or only the given rows)
+
+        Runs chi_square_distances over the gallery in chunks of PREDICT_CHUNK_ROWS rows.
+        Quantized galleries are compared in stored units: the query is quantized with the
+        same scale and only the gathered columns are widened to float32, so the gallery is
+        never dequantized. Chi-square scales linearly, so dividing by the scale at the end
+        gives the same distance.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if self.quantized:
+            query = np.rint(query * np.float32(self.scale))
+        sums = self._row_sums()
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            sums = sums[rows]
+
+        count = len(self) if rows is None else len(rows)
+        result = np.empty(count, np.float64)
+        for start in range(0, count, PREDICT_CHUNK_ROWS):
+            if rows is None:
+                block = self._gallery[start:start + PREDICT_CHUNK_ROWS]
+            else:
+                block = self._gallery[rows[start:start + PREDICT_CHUNK_ROWS]]
+            result[start:start + len(block)] = chi_square_distances(block, query, sums[start:start + len(block)])
+
+        if self.quantized:
+            result /= self.scale
+        return result
+
+    def predict_batch(self, faces, prepare=None):
+        """Get (labels, distances) arrays for a list of face images (prepare normalizes each first)"""
+        labels = np.full(len(faces), -1, np.int64)
+        distances = np.full(len(faces), np.inf)
+        if len(self) == 0:
+            return labels, distances
+        for i, face in enumerate(faces):
+            query = self.compute_histogram(prepare(face) if prepare else face)
+            row = self.distances(query)
+            best = int(np.argmin(row))
+            distances[i] = row[best]
+            if row[best] < self.threshold:
+                labels[i] = self.labels[best]
+        return labels, distances
+
+    def predict(self, src):
+        """Get (label, distance) of the closest stored face, like LBPHFaceRecognizer.predict"""
+        if len(self) == 0:
+            raise ValueError("Model contains no histograms")
+        distances = self.distances(self.compute_histogram(src))
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance >= self.threshold:
+            return -1, distance
+        return int(self.labels[best]), distance
+
+
+def load_model(path):
+    """Load a binary model file"""
+    return BinaryLBPHModel(path)
+
+
+def convert_yaml(yaml_path, output_path, label_mapping_path=None, dtype='float32'):
+    """Convert an OpenCV Trainner.yml (plus label_mapping.json) into the binary format"""
+    try:
+        import cv2
+
+        if not os.path.exists(yaml_path):
+            return False, f"Model not found: {yaml_path}"
+
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(yaml_path)
+
+        label_mapping = {}
+        if label_mapping_path and os.path.exists(label_mapping_path):
+            with open(label_mapping_path, 'r') as f:
+                label_mapping = json.load(f)
+
+        save_recognizer(recognizer, output_path, label_mapping, dtype)
+
+        yaml_mb = os.path.getsize(yaml_path) / (1024 * 1024)
+        binary_mb = os.path.getsize(output_path) / (1024 * 1024)
+        return True, f"Converted {yaml_path} ({yaml_mb:.1f} MB) to {output_path} ({binary_mb:.1f} MB)"
+    except Exception as e:
+        return False, f"Error converting model: {str(e)}"
+
+
+def benchmark(num_faces=2000, queries=50, seed=0):
+    """Compare gallery size, predict time and agreement of the float32 and quantized formats"""
+    import tempfile
+    import time
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    faces = [cv2.GaussianBlur((rng.random((100, 100)) * 255).astype(np.uint8), (5, 5), 0) for _ in range(num_faces)]
+    histograms = np.vstack([compute_histogram(face) for face in faces])
+    labels = np.arange(num_faces) // 10
+    tests = [compute_histogram(faces[i]) for i in rng.integers(0, num_faces, queries)]
+
+    directory = tempfile.mkdtemp()
+    reference = None
+    print(f"Gallery: {num_faces} histograms (cv2 keeps them as float64: {histograms.size * 8 / 2**20:.1f} MB)")
+    for dtype in ['float32'] + list(QUANTIZED_DTYPES):
+        path = os.path.join(directory, f"{dtype}.lbph")
+        save_model(path, histograms, labels, dtype=dtype)
+        model = load_model(path)
+        model.distances(tests[0])
+        started = time.perf_counter()
+        results = [model.distances(query) for query in tests]
+        ms = (time.perf_counter() - started) / queries * 1000
+        if reference is None:
+            reference = results
+        deviation = max(np.abs(r - f).max() for r, f in zip(results, reference))
+        agree = sum(np.argmin(r) == np.argmin(f) for r, f in zip(results, reference))
+        print(f"{dtype:8s} gallery {model._gallery.nbytes / 2**20:6.1f} MB  scale {model.scale:7.0f}  "
+              f"predict {ms:6.2f} ms  max distance error {deviation:.2e}  same match {agree}/{queries}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert an LBPH YAML model to the binary model format")
+    parser.add_argument("--yaml", default=os.path.join("TrainingImageLabel", "Trainner.yml"))
+    parser.add_argument("--mapping", default=os.path.join("TrainingImageLabel", "label_mapping.json"))
+    parser.add_argument("--output", default=os.path.join("TrainingImageLabel", "Trainner.lbph"))
+    parser.add_argument("--dtype", choices=['float32'] + list(QUANTIZED_DTYPES), default='float32')
+    parser.add_argument("--benchmark", action="store_true", help="compare the storage formats on synthetic faces")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        raise SystemExit(0)
+
+    success, message = convert_yaml(args.yaml, args.output, args.mapping, args.dtype)
+    print(message)
+    raise SystemExit(0 if success else 1)
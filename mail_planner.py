@@ -0,0 +1,62 @@
+from database import Database
+from service_registry import register_service
+
+class MailRunPlanner:
+    """Plans an AutoMail run from a single pass over the attendance data"""
+
+    def __init__(self):
+        self.db = Database()
+
+    def plan(self):
+        """Fetch everything a mail run needs and group it into per-class batches
+
+        Returns a plan dict with:
+            'batches': one dict per class with attendance, in faculty order, holding
+                       faculty_id, faculty_name, faculty_email, timetable_id,
+                       class_name, class_size (None if unknown) and records
+                       (rows shaped like get_attendance_by_session)
+            'report_data': aggregates for the admin report
+        """
+        try:
+            rows, class_sizes = self.db.get_mail_run_records()
+
+            batches = []
+            current = None
+            for row in rows:
+                timetable_id = row[2]
+                if current is None or current['timetable_id'] != timetable_id:
+                    current = {
+                        'faculty_id': row[9],
+                        'faculty_name': row[10],
+                        'faculty_email': row[11],
+                        'timetable_id': timetable_id,
+                        'class_name': row[12],
+                        'class_size': class_sizes.get(timetable_id),
+                        'records': []
+                    }
+                    batches.append(current)
+                current['records'].append(row[:9])
+
+            # Attendance percentage per class counts each student once against that
+            # class's size; classes without a recorded session size are left out
+            percentages = []
+            for batch in batches:
+                if batch['class_size']:
+                    present = len(set(r[1] for r in batch['records']))
+                    percentages.append(min(present / batch['class_size'], 1.0) * 100)
+
+            report_data = {
+                'total_sessions': len(batches),
+                'total_faculties': len(set(b['faculty_id'] for b in batches)),
+                'total_marked': len(rows),
+                'total_students': sum(b['class_size'] or 0 for b in batches),
+                'average_attendance': sum(percentages) / len(percentages) if percentages else 0,
+                'classes_averaged': len(percentages)
+            }
+
+            return {'batches': batches, 'report_data': report_data}, f"Planned {len(batches)} class summaries"
+        except Exception as e:
+            return None, f"Error planning mail run: {str(e)}"
+
+# Mail run planner, created on first use
+mail_run_planner = register_service('mail_run_planner', MailRunPlanner)
@@ -1,8 +1,6 @@
 import os  # accessing the os functions
-import check_camera
-import Capture_Image
-import Train_Image
-import Recognize
+# check_camera, Capture_Image, Train_Image and Recognize pull in cv2/pandas,
+# so they are imported when their menu entry is chosen
 
 
 # creating the title bar function
@@ -65,6 +63,7 @@ def mainMenu():
 # calling the camera test function from check camera.py file
 
 def checkCamera():
+    import check_camera
     check_camera.camer()
     key = input("Enter any key to return main menu")
     mainMenu()
@@ -74,6 +73,7 @@ def checkCamera():
 # calling the take image function form capture image.py file
 
 def CaptureFaces():
+    import Capture_Image
     Capture_Image.takeImages()
     key = input("Enter any key to return main menu")
     mainMenu()
@@ -83,6 +83,7 @@ def CaptureFaces():
 # calling the train images from train_images.py file
 
 def Trainimages():
+    import Train_Image
     Train_Image.TrainImages()
     key = input("Enter any key to return main menu")
     mainMenu()
@@ -92,6 +93,7 @@ def Trainimages():
 # calling the recognize_attendance from recognize.py file
 
 def RecognizeFaces():
+    import Recognize
     Recognize.recognize_attendence()
     key = input("Enter any key to return main menu")
     mainMenu()
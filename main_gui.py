@@ -1,8 +1,6 @@
 import os  # accessing the os functions
-import check_camera
-import Capture_Image
-import Train_Image
-import Recognize
+# check_camera, Capture_Image, Train_Image and Recognize pull in cv2/pandas/PIL,
+# so they are imported by the worker thread of each button
 from tkinter import * 
 import tkinter as tk
 import threading
@@ -16,6 +14,7 @@ import threading
 # calling the camera test function from check camera.py file
 
 def cc_call():
+	import check_camera
 	tkStatus.set("Accessing Camera...")
 	status_label.update()
 	check_camera.camer()
@@ -42,6 +41,7 @@ def autom():
 # calling the take image function form capture image.py file
 
 def cfaces_call():
+    import Capture_Image
     tkStatus.set("Capturing Faces...")
     status_label.update()
     try:
@@ -71,6 +71,7 @@ def CaptureFaces():
 # calling the train images from train_images.py file
 
 def timages_call():
+	import Train_Image
 	tkStatus.set("Training Images...")
 	status_label.update()
 	Train_Image.TrainImages()
@@ -86,6 +87,7 @@ def Trainimages():
 # --------------------------------------------------------------------
 # calling the recognize_attendance from recognize.py file
 def rfaces_call():
+	import Recognize
 	tkStatus.set("Recognizing Faces...")
 	status_label.update()
 	Recognize.recognize_attendence()
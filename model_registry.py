@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import lbph_model
+from service_registry import register_service
+
+MODEL_DIR = "TrainingImageLabel"
+POINTER_FILE = "current_model.json"
+KEEP_VERSIONS = 3
+
+
+class ModelRegistry:
+    """Versioned binary LBPH models with a pointer to the current one
+
+    Each trained model is written to TrainingImageLabel/models/v<N>.lbph. The label
+    mapping is stored in the model header, so a model and its mapping are always
+    published together. current_model.json names the current version and is
+    replaced atomically only after the model file is complete. Readers notice a new
+    version with a single stat() of the pointer file.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.versions_dir = os.path.join(model_dir, "models")
+        self.pointer_path = os.path.join(model_dir, POINTER_FILE)
+        self._lock = threading.Lock()
+        self._pointer_mtime = None
+        self._pointer = None
+        self._watchers = []
+        self._watch_thread = None
+
+    def _version_path(self, version):
+        return os.path.join(self.versions_dir, f"v{version:04d}.lbph")
+
+    def current(self):
+        """Get the current pointer {'version', 'path', 'created', ...}, or None if nothing was published"""
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._pointer_mtime:
+            try:
+                with open(self.pointer_path, 'r') as f:
+                    pointer = json.load(f)
+                pointer['path'] = os.path.join(self.model_dir, pointer['model'])
+                self._pointer, self._pointer_mtime = pointer, mtime
+            except Exception as e:
+                print(f"[v0] Error reading {self.pointer_path}: {str(e)}")
+        return self._pointer
+
+    def current_version(self):
+        """Version number of the current model (0 if none)"""
+        pointer = self.current()
+        return pointer['version'] if pointer else 0
+
+    def load_current(self):
+        """Load the current model, returns (version, BinaryLBPHModel) or (0, None)"""
+        pointer = self.current()
+        if not pointer:
+            return 0, None
+        return pointer['version'], lbph_model.load_model(pointer['path'])
+
+    def publish(self, recognizer, label_mapping, metadata=None, dtype='float32'):
+        """Save a trained cv2 LBPH recognizer as the next version and make it current, returns the version
+
+        dtype is the histogram storage of the model file (lbph_model.save_model).
+        """
+        with self._lock:
+            os.makedirs(self.versions_dir, exist_ok=True)
+            version = max(self.current_version(), self._latest_file_version()) + 1
+            path = self._version_path(version)
+            lbph_model.save_recognizer(recognizer, path, label_mapping, dtype, metadata)
+
+            pointer = {
+                'version': version,
+                'model': os.path.relpath(path, self.model_dir),
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'students': len(label_mapping),
+            }
+            tmp_path = self.pointer_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(pointer, f, indent=2)
+            os.replace(tmp_path, self.pointer_path)
+            print(f"[v0] Published model version {version}")
+
+            self._prune(version)
+            return version
+
+    def _latest_file_version(self):
+        """Highest version found in the models directory (guards against a lost pointer)"""
+        versions = [0]
+        if os.path.isdir(self.versions_dir):
+            for name in os.listdir(self.versions_dir):
+                if name.startswith('v') and name.endswith('.lbph') and name[1:-5].isdigit():
+                    versions.append(int(name[1:-5]))
+        return max(versions)
+
+    def _prune(self, current_version):
+        """Delete all but the newest KEEP_VERSIONS model files"""
+        for version in range(1, current_version - KEEP_VERSIONS + 1):
+            path = self._version_path(version)
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # still mapped by a running session (Windows); removed on a later publish
+
+    def watch(self, callback, interval=2.0):
+        """Call callback(version, model) from a background thread whenever a new version is published"""
+        with self._lock:
+            self._watchers.append(callback)
+            if self._watch_thread is None:
+                self._watch_thread = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True)
+                self._watch_thread.start()
+
+    def _watch_loop(self, interval):
+        """Poll the pointer file and load new versions off the recognition thread"""
+        seen = self.current_version()
+        while True:
+            time.sleep(interval)
+            version = self.current_version()
+            if version == seen:
+                continue
+            try:
+                version, model = self.load_current()
+                seen = version
+                for callback in list(self._watchers):
+                    callback(version, model)
+            except Exception as e:
+                print(f"[v0] Error loading model version {version}: {str(e)}")
+                seen = version
+
+# Model version registry, created on first use
+model_registry = register_service('model_registry', ModelRegistry)
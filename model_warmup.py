@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import Future
+from database import Database
+
+class ModelWarmup:
+    """Loads the recognition engine and student directory on a background thread
+
+    app_launcher starts the warm-up when the faculty login window opens, so by the
+    time a faculty clicks "Start Recognition" the model, cascade and student rows
+    are already in memory. ready() returns a Future resolving to (engine, students),
+    where students maps the student database ID to its row.
+
+    Face detectors are per thread (face_detector.get_detector), so the warm-up only
+    checks that the configured one loads; the capture thread calls warm_detector()
+    as soon as it starts to parse its own copy while the camera opens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._future = None
+        self.students = {}
+        self.load_seconds = None
+
+    def start(self):
+        """Start warming up in the background (only the first call does anything); returns the ready-future"""
+        with self._lock:
+            if self._future is None:
+                self._future = Future()
+                threading.Thread(target=self._warm, daemon=True).start()
+            return self._future
+
+    def _warm(self):
+        """Load everything recognition needs and resolve the ready-future"""
+        started = time.perf_counter()
+        try:
+            from service_registry import get_service
+            import face_recognition_engine  # registers the engine service
+            import recognition_client  # pulls in cv2/PIL so the window opens without import stalls
+
+            engine = get_service('face_recognition_engine')
+            self.warm_detector()  # fails early on a missing cascade/DNN file, and caches it
+            students = {student[0]: student for student in Database().get_all_students()}
+            self.students = students
+
+            self.load_seconds = time.perf_counter() - started
+            print(f"[v0] Recognition model warmed up in {self.load_seconds:.2f}s ({len(students)} students)")
+            self._future.set_result((engine, students))
+        except Exception as e:
+            print(f"[v0] Error warming up recognition model: {str(e)}")
+            self._future.set_exception(e)
+
+    def warm_detector(self):
+        """Load the calling thread's face detector now instead of on its first frame"""
+        from face_detector import get_detector
+        return get_detector()
+
+    def ready(self):
+        """Get the ready-future, starting the warm-up if it has not been started"""
+        return self.start()
+
+    def is_ready(self):
+        """Whether the warm-up has finished successfully"""
+        future = self._future
+        return future is not None and future.done() and future.exception() is None
+
+    def wait(self, timeout=None):
+        """Block until warm and return (engine, students)"""
+        return self.ready().result(timeout)
+
+    def get_student(self, student_id):
+        """Get a student row from the warm directory, falling back to the database for new students"""
+        student = self.students.get(student_id)
+        if student is None:
+            student = Database().get_student_by_id(student_id)
+            if student:
+                self.students[student_id] = student
+        return student
+
+# Shared warm-up; creating it is cheap, loading only happens after start()
+model_warmup = ModelWarmup()
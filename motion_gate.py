@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Cheap frame-difference check that lets detection idle while the scene is static
+
+    Each frame is shrunk to a small blurred thumbnail and compared with the thumbnail
+    of the last processed frame. Detection runs only when enough of the thumbnail
+    changed, or after max_skip frames in a row so slow changes are still picked up.
+    """
+
+    def __init__(self, thumbnail_width=80, pixel_threshold=12, changed_fraction=0.005, max_skip=60):
+        self.thumbnail_width = thumbnail_width
+        self.pixel_threshold = pixel_threshold      # grey-level difference that counts as a change
+        self.changed_fraction = changed_fraction    # share of changed thumbnail pixels that counts as motion
+        self.max_skip = max_skip
+        self.reference = None
+        self.skipped_in_row = 0
+        self.frames_seen = 0
+        self.frames_skipped = 0
+
+    def _thumbnail(self, gray):
+        """Small blurred copy of a grayscale frame"""
+        height, width = gray.shape[:2]
+        thumb_height = max(1, int(height * self.thumbnail_width / width))
+        thumb = cv2.resize(gray, (self.thumbnail_width, thumb_height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumb, (5, 5), 0)
+
+    def should_process(self, gray):
+        """Whether detection and recognition should run on this grayscale frame"""
+        self.frames_seen += 1
+        thumb = self._thumbnail(gray)
+
+        if self.reference is not None and self.reference.shape == thumb.shape and self.skipped_in_row < self.max_skip:
+            changed = np.count_nonzero(cv2.absdiff(thumb, self.reference) > self.pixel_threshold)
+            if changed < self.changed_fraction * thumb.size:
+                self.skipped_in_row += 1
+                self.frames_skipped += 1
+                return False
+
+        self.reference = thumb
+        self.skipped_in_row = 0
+        return True
+
+    def reset(self):
+        """Process the next frame regardless of motion"""
+        self.reference = None
+
+    @property
+    def skip_ratio(self):
+        """Share of frames skipped so far"""
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
@@ -6,9 +6,11 @@ from PIL import Image, ImageTk
 from face_recognition_engine import face_recognition_engine
 from attendance_marker import attendance_marker
 from database import Database
+from model_warmup import model_warmup
+from motion_gate import MotionGate
+from room_roi import room_roi_config
+from training_jobs import training_runner
 from datetime import datetime
-import json
-import os
 
 class RecognitionClientWindow:
     """Standalone recognition client for real-time face recognition"""
@@ -30,17 +32,12 @@ class RecognitionClientWindow:
         self.is_running = False
         self.recognized_students = set()
         self.session_id = None
-        self.label_mapping = {}  # Load label mapping once at startup
         self.frame_count = 0
+        self.motion_gate = MotionGate()
+        self.roi_regions = None  # seat regions of the classroom camera
         
-        # Load label mapping
-        if os.path.exists("TrainingImageLabel/label_mapping.json"):
-            try:
-                with open("TrainingImageLabel/label_mapping.json", "r") as f:
-                    self.label_mapping = json.load(f)
-                    print(f"[v0] Label mapping loaded: {self.label_mapping}")
-            except Exception as e:
-                print(f"[v0] Error loading label mapping: {e}")
+        # Usually already warm: app_launcher starts loading while the faculty logs in
+        self.model_ready = model_warmup.ready()
         
         self.setup_ui()
         self.start_session()
@@ -189,13 +186,23 @@ class RecognitionClientWindow:
     def capture_and_recognize(self):
         """Capture video and perform face recognition"""
         try:
+            # Load this thread's face detector and open the camera while the model finishes loading
+            model_warmup.warm_detector()
             self.cap = cv2.VideoCapture(0)
             
             if not self.cap.isOpened():
                 self.root.after(0, lambda: self.update_stats("ERROR: Cannot access webcam"))
                 return
             
+            if not self.model_ready.done():
+                self.root.after(0, lambda: self._update_stats_safe("Loading recognition model..."))
+            engine, _ = self.model_ready.result()
+            print(f"[v0] Label mapping available: {engine.label_mapping}")
+            engine.watch_model_updates()  # retraining during the session swaps the new model in
+            self.roi_regions = room_roi_config.get_regions_for_timetable(self.timetable_id)
+            
             self.frame_count = 0
+            annotations = []
             
             while self.is_running:
                 ret, frame = self.cap.read()
@@ -205,52 +212,15 @@ class RecognitionClientWindow:
                 
                 self.frame_count += 1
                 
-                # Perform face detection and recognition
+                # Only detect when the scene changed, otherwise redraw the last results
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_recognition_engine.face_cascade.detectMultiScale(gray, 1.3, 5)
+                if self.motion_gate.should_process(gray):
+                    annotations = self.recognize_frame(gray)
                 
-                for (x, y, w, h) in faces:
-                    face_roi = gray[y:y+h, x:x+w]
-                    
-                    try:
-                        label, confidence = face_recognition_engine.recognizer.predict(face_roi)
-                        
-                        if str(label) in self.label_mapping:
-                            student_id = int(self.label_mapping[str(label)])
-                            
-                            if confidence < face_recognition_engine.confidence_threshold:
-                                student = self.db.get_student_by_id(student_id)
-                                if student:
-                                    # Mark attendance only once per session
-                                    if student_id not in self.recognized_students:
-                                        attendance_marker.mark_student_present(
-                                            student_id,
-                                            self.timetable_id,
-                                            100 - confidence
-                                        )
-                                        self.recognized_students.add(student_id)
-                                        if self.on_recognized_callback:
-                                            self.root.after(0, lambda: self.on_recognized_callback(self.recognized_students.copy()))
-                                        self.root.after(0, lambda name=student[2], conf=100-confidence: 
-                                                       self.add_recognized_student(name, conf))
-                                
-                                # Draw green rectangle
-                                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                                cv2.putText(frame, f"Recognized (Conf: {100-confidence:.1f}%)", (x, y-10),
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                            else:
-                                # Draw yellow rectangle (low confidence)
-                                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 255), 2)
-                                cv2.putText(frame, f"Low Conf: {100-confidence:.1f}%", (x, y-10),
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
-                        else:
-                            # Draw red rectangle (unknown)
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-                            cv2.putText(frame, f"Unknown", (x, y-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-                    except Exception as e:
-                        print(f"[v0] Recognition error: {e}")
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                for (x, y, w, h), color, text in annotations:
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                    if text:
+                        cv2.putText(frame, text, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
                 
                 # Add frame info
                 cv2.putText(frame, f"Frame: {self.frame_count} | Recognized: {len(self.recognized_students)}", (10, 30),
@@ -269,7 +239,10 @@ class RecognitionClientWindow:
                     stats_text = (
                         f"Session ID: {self.session_id}\n"
                         f"Frames Processed: {self.frame_count}\n"
+                        f"Frames Skipped (no motion): {self.motion_gate.frames_skipped}\n"
+                        f"Faces Skipped (low quality): {face_recognition_engine.quality_gate.rejected_count}\n"
                         f"Students Recognized: {len(self.recognized_students)}\n"
+                        f"Model Version: {face_recognition_engine.model.version}\n"
                         f"Time: {datetime.now().strftime('%H:%M:%S')}"
                     )
                     self.root.after(0, lambda t=stats_text: self._update_stats_safe(t))
@@ -282,6 +255,53 @@ class RecognitionClientWindow:
             if self.cap:
                 self.cap.release()
     
+    def recognize_frame(self, gray):
+        """Detect and recognize faces in one frame, mark attendance and return (box, color, text) annotations"""
+        annotations = []
+        boxes = []
+        
+        for (x, y, w, h) in face_recognition_engine.detect_faces(gray, self.roi_regions):
+            passed, reason = face_recognition_engine.quality_gate.check(gray[y:y+h, x:x+w])
+            if passed:
+                boxes.append((x, y, w, h))
+            else:
+                # Grey rectangle (not worth recognizing)
+                annotations.append(((x, y, w, h), (128, 128, 128), reason))
+        
+        try:
+            results = face_recognition_engine.recognize_batch(gray, boxes)
+        except Exception as e:
+            print(f"[v0] Recognition error: {e}")
+            return annotations + [(box, (0, 0, 255), None) for box in boxes]
+        
+        for box, (student_id, confidence, accepted) in zip(boxes, results.tolist()):
+            if accepted:
+                student = model_warmup.get_student(student_id)
+                if student:
+                    # Mark attendance only once per session
+                    if student_id not in self.recognized_students:
+                        attendance_marker.mark_student_present(
+                            student_id,
+                            self.timetable_id,
+                            100 - confidence
+                        )
+                        self.recognized_students.add(student_id)
+                        if self.on_recognized_callback:
+                            self.root.after(0, lambda: self.on_recognized_callback(self.recognized_students.copy()))
+                        self.root.after(0, lambda name=student[2], conf=100-confidence: 
+                                       self.add_recognized_student(name, conf))
+                
+                # Green rectangle
+                annotations.append((box, (0, 255, 0), f"Recognized (Conf: {100-confidence:.1f}%)"))
+            elif student_id >= 0:
+                # Yellow rectangle (low confidence)
+                annotations.append((box, (0, 255, 255), f"Low Conf: {100-confidence:.1f}%"))
+            else:
+                # Red rectangle (unknown)
+                annotations.append((box, (0, 0, 255), "Unknown"))
+        
+        return annotations
+    
     def _update_video_label(self, photo):
         """Safely update video label from main thread"""
         if self.is_running:
@@ -415,6 +435,49 @@ Instructions:
             relief=tk.FLAT,
             cursor='hand2'
         ).pack(fill=tk.X, ipady=10)
+        
+        # Training progress (training runs in a background process)
+        self.training_status_var = tk.StringVar(value="")
+        tk.Label(content_frame, textvariable=self.training_status_var, bg='#f0f0f0', font=('Arial', 10)).pack(anchor=tk.W, pady=(15, 5))
+        self.cancel_training_button = tk.Button(
+            content_frame,
+            text='Cancel Training',
+            command=self.cancel_training,
+            font=('Arial', 10),
+            bg='#e74c3c',
+            fg='#ffffff',
+            relief=tk.FLAT,
+            cursor='hand2',
+            state=tk.DISABLED
+        )
+        self.cancel_training_button.pack(fill=tk.X, ipady=5)
+        self.training_job = None
+    
+    def start_training(self):
+        """Queue a training run in the background and follow its progress"""
+        self.training_job = training_runner.submit(
+            on_progress=lambda job: self.root.after(0, lambda: self.training_status_var.set(job.describe())),
+            on_done=lambda job: self.root.after(0, lambda: self._training_done(job))
+        )
+        self.training_status_var.set(self.training_job.describe())
+        self.cancel_training_button.config(state=tk.NORMAL)
+    
+    def cancel_training(self):
+        """Cancel the queued or running training job"""
+        if self.training_job and not self.training_job.finished:
+            self.training_status_var.set("Cancelling training...")
+            training_runner.cancel(self.training_job)
+    
+    def _training_done(self, job):
+        """Report a finished training job and load the new model"""
+        self.cancel_training_button.config(state=tk.DISABLED)
+        self.training_status_var.set(job.describe())
+        if job.stage == 'done':
+            if face_recognition_engine.is_loaded():
+                face_recognition_engine.reload_model()
+            messagebox.showinfo("Training Complete", job.message)
+        elif job.stage == 'failed':
+            messagebox.showerror("Training Error", job.message)
     
     def start_capture(self):
         """Start capturing faces"""
@@ -458,11 +521,7 @@ Instructions:
                 # Ask to train model
                 response = messagebox.askyesno("Train Model", "Train the model with captured faces?")
                 if response:
-                    train_success, train_message = face_recognition_engine.train_model()
-                    if train_success:
-                        messagebox.showinfo("Training Complete", train_message)
-                    else:
-                        messagebox.showerror("Training Error", train_message)
+                    self.start_training()
             else:
                 messagebox.showerror("Capture Error", message)
         
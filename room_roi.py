@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from database import Database
+from service_registry import register_service
+
+ROI_CONFIG_PATH = "room_roi.json"
+
+
+class RoomROIConfig:
+    """Seat regions per classroom camera, keyed by timetables.room_number
+
+    room_roi.json maps a room number to a list of [x, y, w, h] regions given as
+    fractions of the frame (0-1), e.g. {"Room 101": [[0.0, 0.35, 1.0, 0.65]]}.
+    Rooms without an entry are scanned whole.
+    """
+
+    def __init__(self, path=ROI_CONFIG_PATH):
+        self.db = Database()
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.rooms = {}
+
+    def _load(self):
+        """Reload the file if it changed on disk"""
+        if not os.path.exists(self.path):
+            self.rooms, self._mtime = {}, None
+            return
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            try:
+                with open(self.path, 'r') as f:
+                    rooms = json.load(f)
+                self.rooms = {room: [self._validate(r) for r in regions] for room, regions in rooms.items()}
+                self._mtime = mtime
+                print(f"[v0] Loaded seat regions for {len(self.rooms)} rooms")
+            except Exception as e:
+                print(f"[v0] Error loading {self.path}: {str(e)}")
+
+    @staticmethod
+    def _validate(region):
+        """Clamp an [x, y, w, h] fraction region to the frame"""
+        x, y, w, h = (float(v) for v in region)
+        x, y = min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+        return [x, y, min(w, 1.0 - x), min(h, 1.0 - y)]
+
+    def get_regions(self, room_number):
+        """Get the fraction regions of a room, or None to scan the whole frame"""
+        if not room_number:
+            return None
+        self._load()
+        return self.rooms.get(room_number) or None
+
+    def get_regions_for_timetable(self, timetable_id):
+        """Get the fraction regions of the room a timetable is held in"""
+        timetable = self.db.get_timetable_by_id(timetable_id)
+        return self.get_regions(timetable[6]) if timetable else None
+
+    def set_regions(self, room_number, regions):
+        """Save the seat regions of a room (an empty list removes the room)"""
+        try:
+            self._load()
+            rooms = dict(self.rooms)
+            if regions:
+                rooms[room_number] = [self._validate(r) for r in regions]
+            else:
+                rooms.pop(room_number, None)
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(rooms, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.rooms, self._mtime = rooms, os.path.getmtime(self.path)
+            return True, f"Saved {len(regions or [])} seat regions for {room_number}"
+        except Exception as e:
+            return False, f"Error saving seat regions: {str(e)}"
+
+
+def to_pixel_rects(regions, width, height):
+    """Convert fraction regions into (x, y, w, h) pixel rectangles of a frame"""
+    rects = []
+    for x, y, w, h in regions:
+        px, py = int(x * width), int(y * height)
+        pw, ph = int(round(w * width)), int(round(h * height))
+        if pw > 0 and ph > 0:
+            rects.append((px, py, min(pw, width - px), min(ph, height - py)))
+    return rects
+
+# Room ROI configuration, created on first use
+room_roi_config = register_service('room_roi_config', RoomROIConfig)
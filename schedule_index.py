@@ -0,0 +1,163 @@
+import bisect
+import threading
+from datetime import datetime
+from database import Database
+from service_registry import register_service
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def minute_of_week(day_of_week, time_str):
+    """Convert a day name and "HH:MM" into minutes since Monday 00:00"""
+    hours, minutes = time_str.strip().split(':')
+    return DAYS.index(day_of_week.strip().lower()) * MINUTES_PER_DAY + int(hours) * 60 + int(minutes)
+
+
+def current_minute_of_week(when=None):
+    """Get the minute of the week for a datetime (defaults to now)"""
+    when = when or datetime.now()
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+class WeeklySchedule:
+    """Timetables of one faculty or room as sorted minute-of-week intervals"""
+
+    def __init__(self):
+        self.entries = []  # (start, end, timetable), sorted by start
+        self.starts = []
+        self.max_end = []  # running maximum of end, lets active lookups stop early
+
+    def add(self, start, end, timetable):
+        """Add an interval (call finalize() once all intervals are added)"""
+        self.entries.append((start, end, timetable))
+
+    def finalize(self):
+        """Sort the intervals and build the lookup arrays"""
+        self.entries.sort(key=lambda e: e[0])
+        self.starts = [e[0] for e in self.entries]
+        self.max_end = []
+        running = -1
+        for _, end, _ in self.entries:
+            running = max(running, end)
+            self.max_end.append(running)
+
+    def active_at(self, minute):
+        """Get the timetable whose interval contains minute, or None"""
+        i = bisect.bisect_right(self.starts, minute) - 1
+        while i >= 0 and self.max_end[i] >= minute:
+            start, end, timetable = self.entries[i]
+            if end >= minute:
+                return timetable
+            i -= 1
+        return None
+
+    def next_after(self, minute):
+        """Get (start, timetable) of the first class starting after minute, wrapping past Sunday"""
+        if not self.entries:
+            return None
+        i = bisect.bisect_right(self.starts, minute)
+        # Intervals shifted back a week only exist to catch classes running over midnight on Sunday
+        while i < len(self.entries) and self.entries[i][0] < 0:
+            i += 1
+        if i < len(self.entries):
+            return self.entries[i][0], self.entries[i][2]
+        for start, _, timetable in self.entries:
+            if start >= 0:
+                return start + MINUTES_PER_WEEK, timetable
+        return None
+
+
+class ScheduleIndex:
+    """Per-faculty and per-room weekly schedule index built from the timetables table
+
+    Timetables are parsed once into minute-of-week intervals. The index rebuilds
+    lazily after Database.add_timetable bumps Database.timetable_revision, or when
+    invalidate() is called.
+    """
+
+    def __init__(self):
+        self.db = Database()
+        self._lock = threading.Lock()
+        self._revision = None
+        self._by_faculty = {}
+        self._by_room = {}
+
+    def invalidate(self):
+        """Force the index to rebuild on the next lookup"""
+        self._revision = None
+
+    def _build(self):
+        """Parse all timetables into weekly schedules"""
+        by_faculty = {}
+        by_room = {}
+
+        for timetable in self.db.get_all_timetables():
+            try:
+                start = minute_of_week(timetable[3], timetable[4])
+                end = minute_of_week(timetable[3], timetable[5])
+            except (ValueError, AttributeError):
+                print(f"[v0] Skipping timetable {timetable[0]} with invalid day/time")
+                continue
+
+            if end < start:
+                end += MINUTES_PER_DAY  # class runs past midnight
+
+            schedules = [by_faculty.setdefault(timetable[1], WeeklySchedule())]
+            if timetable[6]:
+                schedules.append(by_room.setdefault(timetable[6], WeeklySchedule()))
+
+            for schedule in schedules:
+                schedule.add(start, end, timetable)
+                if end >= MINUTES_PER_WEEK:
+                    schedule.add(start - MINUTES_PER_WEEK, end - MINUTES_PER_WEEK, timetable)
+
+        for schedule in list(by_faculty.values()) + list(by_room.values()):
+            schedule.finalize()
+
+        self._by_faculty = by_faculty
+        self._by_room = by_room
+
+    def _ensure_current(self):
+        """Rebuild the index if timetables changed since it was built"""
+        revision = Database.timetable_revision
+        if self._revision == revision:
+            return
+        with self._lock:
+            if self._revision != revision:
+                self._build()
+                self._revision = revision
+
+    def get_faculty_schedule(self, faculty_id):
+        """Get the WeeklySchedule of a faculty, or None if it has no timetables"""
+        self._ensure_current()
+        return self._by_faculty.get(faculty_id)
+
+    def get_room_schedule(self, room_number):
+        """Get the WeeklySchedule of a room, or None if it has no timetables"""
+        self._ensure_current()
+        return self._by_room.get(room_number)
+
+    def get_active_class(self, faculty_id, when=None):
+        """Get the timetable active for a faculty at when (defaults to now), or None"""
+        schedule = self.get_faculty_schedule(faculty_id)
+        return schedule.active_at(current_minute_of_week(when)) if schedule else None
+
+    def get_next_class(self, faculty_id, when=None):
+        """Get (start_minute_of_week, timetable) of the next class for a faculty, or None"""
+        schedule = self.get_faculty_schedule(faculty_id)
+        return schedule.next_after(current_minute_of_week(when)) if schedule else None
+
+    def get_active_class_in_room(self, room_number, when=None):
+        """Get the timetable active in a room at when (defaults to now), or None"""
+        schedule = self.get_room_schedule(room_number)
+        return schedule.active_at(current_minute_of_week(when)) if schedule else None
+
+    def get_next_class_in_room(self, room_number, when=None):
+        """Get (start_minute_of_week, timetable) of the next class in a room, or None"""
+        schedule = self.get_room_schedule(room_number)
+        return schedule.next_after(current_minute_of_week(when)) if schedule else None
+
+# Schedule index, created on first use
+schedule_index = register_service('schedule_index', ScheduleIndex)
@@ -0,0 +1,132 @@
+import time
+from datetime import datetime, timedelta
+from database import Database
+from service_registry import register_service
+
+class CampusScheduleService:
+    """Campus-wide schedule queries across all rooms, answered by indexed SQL on timetables"""
+
+    def __init__(self):
+        self.db = Database()
+
+    def get_active_sessions(self, when=None):
+        """Get every timetable running at when (defaults to now), one query for the whole campus"""
+        try:
+            when = when or datetime.now()
+            sessions = self.db.get_timetables_active_at(when.strftime("%A"), when.strftime("%H:%M"))
+            return sessions, f"{len(sessions)} active sessions"
+        except Exception as e:
+            return None, f"Error: {str(e)}"
+
+    def get_active_sessions_by_room(self, when=None):
+        """Get a room_number -> timetable dict of the sessions running at when"""
+        sessions, message = self.get_active_sessions(when)
+        if sessions is None:
+            return None, message
+        return {session[6]: session for session in sessions if session[6]}, message
+
+    def get_upcoming_sessions(self, minutes, when=None):
+        """Get every timetable starting within the next minutes (at most a day) after when"""
+        try:
+            when = when or datetime.now()
+            minutes = min(int(minutes), 24 * 60)
+            until = when + timedelta(minutes=minutes)
+
+            ranges = []
+            if until.date() == when.date():
+                ranges.append((when.strftime("%A"), when.strftime("%H:%M"), until.strftime("%H:%M")))
+            else:
+                # Window crosses midnight: rest of today plus the start of tomorrow
+                ranges.append((when.strftime("%A"), when.strftime("%H:%M"), "23:59"))
+                ranges.append((until.strftime("%A"), "", until.strftime("%H:%M")))
+
+            sessions = self.db.get_timetables_starting_between(ranges)
+
+            # Sort today's sessions before tomorrow's, then by start time
+            today = when.strftime("%A").lower()
+            sessions.sort(key=lambda s: (s[3].lower() != today, s[4]))
+            return sessions, f"{len(sessions)} sessions starting in the next {minutes} minutes"
+        except Exception as e:
+            return None, f"Error: {str(e)}"
+
+# Campus schedule service, created on first use
+campus_schedule_service = register_service('campus_schedule_service', CampusScheduleService)
+
+
+def benchmark(num_rows=10000, num_rooms=500, num_faculties=1000, queries=200):
+    """Compare the campus query against per-faculty active-class lookups on a scratch database"""
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    import database
+
+    # The scratch database lives in a temporary directory removed on exit; the real DB_PATH is restored
+    original_db_path = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            database.DB_PATH = os.path.join(tmp_dir, "benchmark.db")
+            db = Database()
+
+            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+            conn = sqlite3.connect(database.DB_PATH)
+            conn.executemany(
+                'INSERT INTO faculties (name, email, department, passcode_hash) VALUES (?, ?, ?, ?)',
+                [(f"Faculty {i}", f"faculty{i}@example.com", "CS", "x") for i in range(num_faculties)]
+            )
+            rows = []
+            for i in range(num_rows):
+                start = random.randint(8 * 60, 18 * 60)
+                end = start + random.choice([50, 60, 90])
+                rows.append((random.randint(1, num_faculties), f"Class {i}", random.choice(days),
+                             f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}",
+                             f"Room {random.randint(1, num_rooms)}"))
+            conn.executemany(
+                'INSERT INTO timetables (faculty_id, class_name, day_of_week, start_time, end_time, room_number) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+            conn.commit()
+            conn.execute('ANALYZE')
+            plan = conn.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM timetables t WHERE t.day_of_week = ? COLLATE NOCASE '
+                'AND t.start_time <= ? AND t.end_time >= ?', ("Monday", "10:00", "10:00")
+            ).fetchall()
+            conn.close()
+
+            service = CampusScheduleService()
+            moments = [datetime(2024, 1, 1) + timedelta(minutes=random.randint(0, 7 * 24 * 60 - 1)) for _ in range(queries)]
+
+            started = time.perf_counter()
+            active_total = 0
+            for when in moments:
+                sessions, _ = service.get_active_sessions(when)
+                active_total += len(sessions)
+            campus_ms = (time.perf_counter() - started) * 1000 / queries
+
+            started = time.perf_counter()
+            for when in moments:
+                service.get_upcoming_sessions(15, when)
+            upcoming_ms = (time.perf_counter() - started) * 1000 / queries
+
+            # The old way: one get_faculty_timetables call and a Python scan per faculty
+            loop_moments = moments[:5]
+            started = time.perf_counter()
+            for when in loop_moments:
+                day, now = when.strftime("%A").lower(), when.strftime("%H:%M")
+                for faculty_id in range(1, num_faculties + 1):
+                    for timetable in db.get_faculty_timetables(faculty_id):
+                        if timetable[3].lower() == day and timetable[4] <= now <= timetable[5]:
+                            break
+            per_faculty_ms = (time.perf_counter() - started) * 1000 / len(loop_moments)
+
+            print(f"Timetable rows: {num_rows}, rooms: {num_rooms}, faculties: {num_faculties}")
+            print(f"Query plan: {[row[-1] for row in plan]}")
+            print(f"Active sessions (campus query):   {campus_ms:8.2f} ms/query, {active_total / queries:.1f} sessions on average")
+            print(f"Starting in next 15 minutes:      {upcoming_ms:8.2f} ms/query")
+            print(f"Per-faculty get_active_class loop: {per_faculty_ms:8.2f} ms/sweep")
+
+        finally:
+            database.DB_PATH = original_db_path
+
+if __name__ == "__main__":
+    benchmark()
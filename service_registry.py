@@ -0,0 +1,60 @@
+import threading
+
+class LazyService:
+    """Stand-in for a module-level service instance that is only created on first use
+
+    Attribute reads and writes are forwarded to the real instance, so modules can
+    keep exporting e.g. `face_recognition_engine` and callers use it unchanged,
+    while importing the module no longer loads models or opens the database.
+    """
+
+    def __init__(self, name, factory):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self):
+        """Create the service on first use (thread-safe) and return it"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    def is_loaded(self):
+        """Whether the service has been created yet"""
+        return self._instance is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded() else "not loaded"
+        return f"<LazyService {self._name} ({state})>"
+
+
+_services = {}
+
+
+def register_service(name, factory):
+    """Register a service factory and return its lazy stand-in"""
+    service = LazyService(name, factory)
+    _services[name] = service
+    return service
+
+
+def get_service(name):
+    """Get the real instance of a registered service, creating it if needed"""
+    return _services[name]._resolve()
+
+
+def loaded_services():
+    """Names of the registered services that have been created so far"""
+    return [name for name, service in _services.items() if service.is_loaded()]
@@ -1,4 +1,6 @@
 from database import Database
+from service_registry import register_service
+from schedule_index import schedule_index, MINUTES_PER_DAY
 from datetime import datetime, timedelta
 
 class TimetableManager:
@@ -13,6 +15,7 @@ class TimetableManager:
             timetable_id = self.db.add_timetable(
                 faculty_id, class_name, day_of_week, start_time, end_time, room_number
             )
+            schedule_index.invalidate()
             return timetable_id, "Timetable entry added successfully"
         except Exception as e:
             return None, f"Error adding timetable: {str(e)}"
@@ -28,23 +31,12 @@ class TimetableManager:
     def get_active_class(self, faculty_id):
         """Get the currently active class for a faculty"""
         try:
-            timetables = self.db.get_faculty_timetables(faculty_id)
-            
-            if not timetables:
+            if not schedule_index.get_faculty_schedule(faculty_id):
                 return None, "No timetables found"
             
-            current_time = datetime.now()
-            current_day = current_time.strftime("%A")
-            current_time_str = current_time.strftime("%H:%M")
-            
-            for timetable in timetables:
-                timetable_day = timetable[3]
-                start_time = timetable[4]
-                end_time = timetable[5]
-                
-                if timetable_day.lower() == current_day.lower():
-                    if start_time <= current_time_str <= end_time:
-                        return timetable, "Active class found"
+            timetable = schedule_index.get_active_class(faculty_id)
+            if timetable:
+                return timetable, "Active class found"
             
             return None, "No active class at this time"
         except Exception as e:
@@ -53,36 +45,22 @@ class TimetableManager:
     def get_next_class(self, faculty_id):
         """Get the next upcoming class for a faculty"""
         try:
-            timetables = self.db.get_faculty_timetables(faculty_id)
-            
-            if not timetables:
+            if not schedule_index.get_faculty_schedule(faculty_id):
                 return None, "No timetables found"
             
             current_time = datetime.now()
-            current_day = current_time.strftime("%A")
-            current_time_str = current_time.strftime("%H:%M")
+            next_class = schedule_index.get_next_class(faculty_id, current_time)
             
-            # Look for next class today
-            for timetable in timetables:
-                timetable_day = timetable[3]
-                start_time = timetable[4]
-                
-                if timetable_day.lower() == current_day.lower():
-                    if start_time > current_time_str:
-                        return timetable, "Next class found today"
+            if not next_class:
+                return None, "No upcoming classes found"
             
-            # Look for classes in next 7 days
-            for i in range(1, 8):
-                future_date = current_time + timedelta(days=i)
-                future_day = future_date.strftime("%A")
-                
-                for timetable in timetables:
-                    timetable_day = timetable[3]
-                    
-                    if timetable_day.lower() == future_day.lower():
-                        return timetable, f"Next class found on {future_day}"
+            start_minute, timetable = next_class
+            days_ahead = start_minute // MINUTES_PER_DAY - current_time.weekday()
+            if days_ahead == 0:
+                return timetable, "Next class found today"
             
-            return None, "No upcoming classes found"
+            future_day = (current_time + timedelta(days=days_ahead)).strftime("%A")
+            return timetable, f"Next class found on {future_day}"
         except Exception as e:
             return None, f"Error: {str(e)}"
     
@@ -109,5 +87,5 @@ class TimetableManager:
         valid_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         return day_str in valid_days
 
-# Initialize timetable manager
-timetable_manager = TimetableManager()
+# Timetable manager, created on first use
+timetable_manager = register_service('timetable_manager', TimetableManager)
@@ -0,0 +1,239 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from service_registry import register_service
+
+LOCK_PATH = "TrainingImageLabel" + os.sep + "training.lock"
+PROGRESS_PREFIX = "TRAINING_PROGRESS "
+TRAIN_SECONDS_PER_IMAGE = 0.006  # LBPH train + YAML save, measured on 100x100 faces
+
+
+@contextmanager
+def training_lock(path=LOCK_PATH, on_wait=None, poll=1.0):
+    """Hold the exclusive model-writing lock, waiting (and calling on_wait) while another process has it
+
+    The OS releases the lock if the holder dies, so a killed trainer never leaves it stuck.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+') as f:
+        while True:
+            try:
+                if os.name == 'nt':
+                    import msvcrt
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if on_wait:
+                    on_wait()
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class TrainingJob:
+    """One queued training run; its fields are updated from the runner's threads"""
+
+    def __init__(self, job_id, on_progress=None, on_done=None):
+        self.job_id = job_id
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.stage = 'queued'  # queued, waiting, loading, training, saving, done, failed, cancelled
+        self.images_done = 0
+        self.images_total = 0
+        self.identities = 0
+        self.started = None
+        self.loading_started = None
+        self.training_started = None
+        self.success = None
+        self.message = ""
+        self.cancel_requested = False
+        self.process = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def eta_seconds(self):
+        """Estimated seconds left, from the image loading rate plus the training estimate"""
+        if self.stage not in ('loading', 'training', 'saving') or not self.images_total:
+            return None
+        remaining_train = self.images_total * TRAIN_SECONDS_PER_IMAGE
+        if self.stage == 'loading':
+            if not self.images_done or self.loading_started is None:
+                return None
+            elapsed = time.time() - self.loading_started
+            return elapsed / self.images_done * (self.images_total - self.images_done) + remaining_train
+        if self.training_started is None:
+            return remaining_train
+        return max(remaining_train - (time.time() - self.training_started), 0.0)
+
+    def describe(self):
+        """One-line status for the GUI"""
+        if self.stage == 'queued':
+            return "Training queued"
+        if self.stage == 'waiting':
+            return "Waiting for another training run to finish..."
+        if self.stage in ('done', 'failed', 'cancelled'):
+            return self.message
+        eta = self.eta_seconds()
+        text = f"{self.stage.capitalize()}: {self.images_done}/{self.images_total} images, {self.identities} students"
+        return text + (f", about {int(eta) + 1}s left" if eta is not None else "")
+
+    def wait(self, timeout=None):
+        """Block until the job finished and return (success, message)"""
+        self._done.wait(timeout)
+        return self.success, self.message
+
+
+class TrainingJobRunner:
+    """Trains the model in a subprocess, one job at a time
+
+    submit() queues a job and returns it; a submit while another job is still queued
+    returns that job, since it will train on every image anyway. The subprocess takes
+    training_lock() before loading images, so trainers started from other processes
+    (another admin's GUI, Train_Image.py) never write the model files at the same time.
+    Progress and completion callbacks run on the runner's threads; Tk callers
+    should hop back with root.after().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pending = None
+        self._current = None
+        self._next_id = 1
+        self._worker = None
+
+    def submit(self, on_progress=None, on_done=None):
+        """Queue a training run, returns its TrainingJob"""
+        with self._lock:
+            if self._pending is not None:
+                return self._pending
+            job = TrainingJob(self._next_id, on_progress, on_done)
+            self._next_id += 1
+            self._pending = job
+            self._queue.put(job)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_jobs, daemon=True)
+                self._worker.start()
+            return job
+
+    def current_job(self):
+        """The job being trained right now, if any"""
+        return self._current
+
+    def cancel(self, job):
+        """Cancel a queued or running job (a job that is saving the model finishes saving first)"""
+        job.cancel_requested = True
+        with self._lock:
+            if job is self._pending:
+                self._pending = None
+                self._finish(job, 'cancelled', False, "Training cancelled")
+                return
+        process = job.process
+        if process is not None and job.stage != 'saving' and process.poll() is None:
+            process.terminate()
+
+    def _run_jobs(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.finished:
+                    continue  # cancelled while queued
+                self._pending = None
+                self._current = job
+            try:
+                self._run(job)
+            except Exception as e:
+                self._finish(job, 'failed', False, f"Error running training: {str(e)}")
+            finally:
+                self._current = None
+
+    def _run(self, job):
+        """Start the training subprocess and follow its progress lines"""
+        job.started = time.time()
+        job.process = subprocess.Popen(
+            [sys.executable, '-u', os.path.abspath(__file__), '--worker'],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            cwd=os.getcwd(),
+        )
+        result = None
+        for line in job.process.stdout:
+            if not line.startswith(PROGRESS_PREFIX):
+                print(line, end="")
+                continue
+            update = json.loads(line[len(PROGRESS_PREFIX):])
+            if update['stage'] == 'result':
+                result = update
+                continue
+            self._update(job, update)
+        job.process.wait()
+
+        if job.cancel_requested and result is None:
+            self._finish(job, 'cancelled', False, "Training cancelled")
+        elif result is None:
+            self._finish(job, 'failed', False, f"Training process exited with code {job.process.returncode}")
+        else:
+            self._finish(job, 'done' if result['success'] else 'failed', result['success'], result['message'])
+
+    def _update(self, job, update):
+        stage = update['stage']
+        if stage == 'loading' and job.stage != 'loading':
+            job.loading_started = time.time()
+        elif stage == 'training' and job.stage != 'training':
+            job.training_started = time.time()
+        job.stage = stage
+        job.images_done = update.get('images_done', job.images_done)
+        job.images_total = update.get('images_total', job.images_total)
+        job.identities = update.get('identities', job.identities)
+        if job.on_progress:
+            job.on_progress(job)
+
+    def _finish(self, job, stage, success, message):
+        job.stage, job.success, job.message = stage, success, message
+        print(f"[v0] Training job {job.job_id}: {message}")
+        job._done.set()
+        if job.on_done:
+            job.on_done(job)
+
+
+def _emit(stage, images_done=0, images_total=0, identities=0, **extra):
+    """Write one progress line for the parent process"""
+    update = {'stage': stage, 'images_done': images_done, 'images_total': images_total, 'identities': identities}
+    update.update(extra)
+    print(PROGRESS_PREFIX + json.dumps(update), flush=True)
+
+
+def run_worker():
+    """Subprocess entry point: train under the lock and report progress on stdout"""
+    with training_lock(on_wait=lambda: _emit('waiting')):
+        from face_recognition_engine import FaceRecognitionEngine
+        success, message = FaceRecognitionEngine().train_model(progress=_emit)
+    _emit('result', success=success, message=message)
+    return 0 if success else 1
+
+# Shared training runner, created on first use
+training_runner = register_service('training_runner', TrainingJobRunner)
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        sys.exit(run_worker())